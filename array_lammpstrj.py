@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+"""Load frames from a lammpstrj file into arrays.
+
+The positions for a range of frames are stored in one array with shape
+``(n_frames, n_atoms, 3)``, with the atoms ordered by their id, and the
+boxes are stored in an array with shape ``(n_frames, 6)`` holding
+``lx, ly, lz, xy, xz, yz`` for each frame.
+"""
+import sys
+import numpy as np
+from index_lammpstrj import IndexedTrajectory
+from read_lammpstrj import frame_to_dict, read_lammpstrj_slice
+
+
+# Sets of coordinate columns, the first found in a dump is used:
+COORDINATES = (
+    (('xu', 'yu', 'zu'), False, True),
+    (('xsu', 'ysu', 'zsu'), True, True),
+    (('x', 'y', 'z'), False, False),
+    (('xs', 'ys', 'zs'), True, False),
+)
+IMAGES = ('ix', 'iy', 'iz')
+VELOCITIES = ('vx', 'vy', 'vz')
+
+
+def atom_columns(frame):
+    """Get the names of the atom columns from the lines of a frame."""
+    for lines in frame:
+        if lines.startswith('ITEM: ATOMS'):
+            return lines.split()[2:]
+    return []
+
+
+def coordinate_columns(keys):
+    """Find the coordinate columns in a dump.
+
+    Returns
+    -------
+    out : tuple
+        The names of the columns, and booleans telling if the
+        coordinates are scaled and if they are unwrapped.
+    """
+    for names, scaled, unwrapped in COORDINATES:
+        if all(i in keys for i in names):
+            return names, scaled, unwrapped
+    raise ValueError('No coordinates found in the dump')
+
+
+def box_parameters(box):
+    """Get the origin and the box parameters from a box dictionary.
+
+    For triclinic boxes, LAMMPS writes the bounding box to the dump,
+    here we convert it back to the box itself.
+
+    Returns
+    -------
+    origin : numpy.array
+        The lower box bounds, ``xlo, ylo, zlo``.
+    params : numpy.array
+        The box lengths and tilts, ``lx, ly, lz, xy, xz, yz``.
+    """
+    xlo, xhi = box['xlo'], box['xhi']
+    ylo, yhi = box['ylo'], box['yhi']
+    zlo, zhi = box['zlo'], box['zhi']
+    xy = box.get('xy', 0.0)
+    xz = box.get('xz', 0.0)
+    yz = box.get('yz', 0.0)
+    xlo -= min(0.0, xy, xz, xy + xz)
+    xhi -= max(0.0, xy, xz, xy + xz)
+    ylo -= min(0.0, yz)
+    yhi -= max(0.0, yz)
+    return (
+        np.array([xlo, ylo, zlo]),
+        np.array([xhi - xlo, yhi - ylo, zhi - zlo, xy, xz, yz]),
+    )
+
+
+def box_matrices(box):
+    """Convert box parameters to matrices with the box vectors as columns.
+
+    Parameters
+    ----------
+    box : numpy.array
+        The box parameters with shape ``(n_frames, 6)``.
+
+    Returns
+    -------
+    out : numpy.array
+        The matrices, with shape ``(n_frames, 3, 3)``.
+    """
+    matrix = np.zeros((len(box), 3, 3))
+    matrix[:, 0, 0] = box[:, 0]
+    matrix[:, 1, 1] = box[:, 1]
+    matrix[:, 2, 2] = box[:, 2]
+    matrix[:, 0, 1] = box[:, 3]
+    matrix[:, 0, 2] = box[:, 4]
+    matrix[:, 1, 2] = box[:, 5]
+    return matrix
+
+
+def unwrap_images(positions, images, box):
+    """Unwrap positions with image flags, for all frames at once."""
+    return positions + np.einsum('fij,fnj->fni', box_matrices(box), images)
+
+
+def unwrap_continuous(positions, box):
+    """Unwrap positions by assuming that atoms move less than half a box.
+
+    The displacements between consecutive frames are wrapped with the
+    minimum image convention (in the box of the later frame) and
+    added up.
+    """
+    if len(positions) < 2:
+        return positions.copy()
+    matrix = box_matrices(box[1:])
+    inverse = np.linalg.inv(matrix)
+    delta = np.einsum('fij,fnj->fni', inverse, np.diff(positions, axis=0))
+    delta -= np.round(delta)
+    delta = np.einsum('fij,fnj->fni', matrix, delta)
+    unwrapped = np.empty_like(positions)
+    unwrapped[0] = positions[0]
+    np.cumsum(delta, axis=0, out=unwrapped[1:])
+    unwrapped[1:] += positions[0]
+    return unwrapped
+
+
+def iter_selected_frames(traj, selected, lmp=None):
+    """Iterate over the selected frames, as lines.
+
+    Parameters
+    ----------
+    traj : object like IndexedTrajectory
+        The trajectory.
+    selected : range
+        The frames to read.
+    lmp : string or pathlib.Path, optional
+        The trajectory file. If given, a contiguous range of frames is
+        read in one pass by :py:func:`read_lammpstrj.read_lammpstrj_slice`,
+        and only other selections use random access with the index.
+    """
+    if lmp is not None and selected.step == 1:
+        yield from read_lammpstrj_slice(lmp, start=selected.start,
+                                        stop=selected.stop)
+        return
+    for i in selected:
+        yield traj.raw_frame(i)
+
+
+def read_trajectory_arrays(lmp, start=None, stop=None, step=None,
+                           unwrap=None, select=None, velocities=False):
+    """Read a range of frames into arrays.
+
+    Parameters
+    ----------
+    lmp : string, pathlib.Path or object like IndexedTrajectory
+        The trajectory to read. Contiguous ranges of frames are read
+        from a file in one pass, other selections are read with the
+        frame index. An open trajectory can be given when reading
+        several ranges, it continues from the previous range (which,
+        for compressed files, avoids decompressing from the start).
+    start, stop, step : integers, optional
+        The frames to read, as for ``frames[start:stop:step]``.
+    unwrap : string, optional
+        How to unwrap the positions: ``None`` keeps them as in the
+        dump, ``'image'`` uses the image flags and ``'continuous'``
+        uses the minimum image convention between frames. Positions
+        which are already unwrapped in the dump are not changed.
+    select : dict, optional
+        Criteria for selecting atoms, see
+        :py:func:`read_lammpstrj.select_atoms`.
+    velocities : boolean, optional
+        If True, the velocities are also read.
+
+    Returns
+    -------
+    out : dict of numpy.arrays
+        ``timestep`` (n_frames), ``id`` (n_atoms), ``type`` (n_atoms,
+        if present in the dump), ``positions`` (n_frames, n_atoms, 3),
+        ``velocities`` (n_frames, n_atoms, 3, if requested), ``box``
+        (n_frames, 6) and ``origin`` (n_frames, 3).
+    """
+    if unwrap not in (None, 'image', 'continuous'):
+        raise ValueError(f'Unknown unwrap method "{unwrap}"')
+    if isinstance(lmp, IndexedTrajectory):
+        traj, lmp = lmp, None
+    else:
+        traj = IndexedTrajectory(lmp)
+    selected = range(len(traj))[start:stop:step]
+    nframes = len(selected)
+    result = {
+        'timestep': traj.timesteps[selected],
+        'box': np.zeros((nframes, 6)),
+        'origin': np.zeros((nframes, 3)),
+    }
+    box = result['box']
+    origin = result['origin']
+    positions = None
+    images = None
+    columns = None
+    idx = None
+    last_id = None
+    frames = iter_selected_frames(traj, selected, lmp=lmp)
+    for i, (frame_no, frame) in enumerate(zip(selected, frames)):
+        if columns is None:
+            keys = atom_columns(frame)
+            names, scaled, unwrapped = coordinate_columns(keys)
+            use_images = unwrap == 'image' and not unwrapped
+            if use_images and not all(j in keys for j in IMAGES):
+                raise ValueError('No image flags found in the dump')
+            if velocities and not all(j in keys for j in VELOCITIES):
+                raise ValueError('No velocities found in the dump')
+            columns = ['id'] + list(names)
+            if 'type' in keys:
+                columns.append('type')
+            if use_images:
+                columns.extend(IMAGES)
+            if velocities:
+                columns.extend(VELOCITIES)
+        data = frame_to_dict(frame, columns=columns, select=select)
+        atoms = data['atoms']
+        if idx is None or not np.array_equal(atoms['id'], last_id):
+            last_id = atoms['id']
+            idx = np.argsort(last_id)
+            if 'id' not in result:
+                natoms = len(last_id)
+                result['id'] = last_id[idx]
+                if 'type' in atoms:
+                    result['type'] = atoms['type'][idx]
+                positions = np.zeros((nframes, natoms, 3))
+                result['positions'] = positions
+                if use_images:
+                    images = np.zeros((nframes, natoms, 3), dtype=np.int64)
+                if velocities:
+                    result['velocities'] = np.zeros((nframes, natoms, 3))
+            elif not np.array_equal(last_id[idx], result['id']):
+                raise ValueError(f'The atoms changed in frame {frame_no}')
+        for j, key in enumerate(names):
+            positions[i, :, j] = atoms[key][idx]
+        if images is not None:
+            for j, key in enumerate(IMAGES):
+                images[i, :, j] = atoms[key][idx]
+        if velocities:
+            for j, key in enumerate(VELOCITIES):
+                result['velocities'][i, :, j] = atoms[key][idx]
+        origin[i], box[i] = box_parameters(data['box'])
+    frames.close()
+    if lmp is not None:
+        traj.close()
+    if positions is None:
+        result['id'] = np.zeros(0, dtype=np.int64)
+        result['positions'] = np.zeros((nframes, 0, 3))
+        return result
+    if scaled:
+        positions[...] = origin[:, np.newaxis, :] + np.einsum(
+            'fij,fnj->fni', box_matrices(box), positions
+        )
+    if images is not None:
+        result['positions'] = unwrap_images(positions, images, box)
+    elif unwrap == 'continuous' and not unwrapped:
+        result['positions'] = unwrap_continuous(positions, box)
+    return result
+
+
+def main(infile):
+    """Read all frames and print the shapes of the arrays."""
+    arrays = read_trajectory_arrays(infile)
+    for key, val in arrays.items():
+        print(f'{key}: {val.shape}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
@@ -3,12 +3,16 @@ import argparse
 from math import ceil
 import pathlib
 import numpy as np
-from matplotlib import pyplot as plt
-from matplotlib.cm import get_cmap
-from matplotlib.gridspec import GridSpec
 
 
-plt.style.use('seaborn-talk')
+def import_pyplot():
+    """Import pyplot and set the plot style, only when plotting."""
+    from matplotlib import pyplot as plt
+    try:
+        plt.style.use('seaborn-talk')
+    except OSError:  # renamed in matplotlib 3.6
+        plt.style.use('seaborn-v0_8-talk')
+    return plt
 
 
 def read_lammps_profile(filename):
@@ -100,13 +104,14 @@ def average_profiles(infile):
 
 def plot_all_items(data, error):
     """Plot all items in a dict."""
+    plt = import_pyplot()
     fig = plt.figure()
     if len(data) < 3:
         ncol = 1
     else:
         ncol = 2
     nrow = ceil(len(data) / ncol)
-    grid = GridSpec(nrow, ncol)
+    grid = fig.add_gridspec(nrow, ncol)
     for i, (key, val) in enumerate(data.items()):
         row, col = divmod(i, ncol)
         axi = fig.add_subplot(grid[row, col])
@@ -121,6 +126,7 @@ def plot_all_items(data, error):
 
 def plot_xy_data(xdata, ydata, yerror=None, xlabel='x', ylabel='y'):
     """Plot xy data."""
+    plt = import_pyplot()
     fig = plt.figure()
     ax1 = fig.add_subplot(111)
     if yerror is not None:
@@ -136,8 +142,9 @@ def plot_xy_data(xdata, ydata, yerror=None, xlabel='x', ylabel='y'):
 
 def plot_all_sets(raw_data, key, color_map_name='viridis'):
     """Plot all sets for a given variable."""
+    plt = import_pyplot()
     data = raw_data[key]
-    cmap = get_cmap(name=color_map_name)
+    cmap = plt.get_cmap(color_map_name)
     colors = cmap(np.linspace(0, 1, len(data)))
     fig = plt.figure()
     ax1 = fig.add_subplot(111)
@@ -256,4 +263,4 @@ if __name__ == '__main__':
     ARGS = create_parser().parse_args()
     main(ARGS.file, ARGS.plot, split=ARGS.split)
     if ARGS.plot:
-        plt.show()
+        import_pyplot().show()
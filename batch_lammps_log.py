@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""Summarize the thermo output in many LAMMPS log files.
+
+The log files are read in parallel by worker processes, each log in
+chunks (see ``stats_lammps_log.py``), and one summary table is written
+with a row for each run in each log: the number of rows and the mean,
+standard deviation and final value of every thermo column. The table
+is stored as CSV and as a NumPy ``.npz`` file. Nothing is plotted, and
+pyplot is never imported, so this also works without a display.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import glob
+import numpy as np
+from read_lammps_log import read_lammps_log_chunks
+from stats_lammps_log import RunningStats
+
+
+# The statistics stored for each column:
+SUMMARY_STATS = ('mean', 'std', 'final')
+
+
+def summarize_log(logfile):
+    """Summarize the thermo output of each run in a log file.
+
+    This is the task executed by the worker processes.
+
+    Returns
+    -------
+    out : list of dicts
+        For each run, the log file, the number of the run, the number
+        of rows, the keys and the statistics for each key.
+    """
+    runs = {}
+    try:
+        for run, keys, data in read_lammps_log_chunks(logfile):
+            if run not in runs:
+                runs[run] = {'keys': keys, 'stats': RunningStats()}
+            runs[run]['stats'].update(data)
+            runs[run]['final'] = data[-1]
+    except OSError as error:
+        print(f'Could not read "{logfile}": {error}')
+        return []
+    summary = []
+    for run, item in runs.items():
+        stats = item['stats']
+        values = {
+            'mean': stats.mean(),
+            'std': np.sqrt(stats.variance()),
+            'final': item['final'],
+        }
+        summary.append({
+            'logfile': str(logfile),
+            'run': run,
+            'rows': stats.count,
+            'keys': item['keys'],
+            'stats': {
+                key: {name: float(values[name][i]) for name in SUMMARY_STATS}
+                for i, key in enumerate(item['keys'])
+            },
+        })
+    return summary
+
+
+def summarize_logs(logfiles, workers=None):
+    """Summarize several log files using worker processes.
+
+    Returns
+    -------
+    out : list of dicts
+        The summaries of the runs, see :py:func:`.summarize_log`, in
+        the order of the log files.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(summarize_log, logfiles)
+        return [run for result in results for run in result]
+
+
+def summary_table(summary):
+    """Arrange the summaries of the runs as one table.
+
+    The table has a column for each statistic of each thermo key
+    found in any run (for instance ``temp_mean``), NaN is used for
+    keys a run does not have.
+
+    Returns
+    -------
+    out : dict of numpy.arrays
+        The columns of the table, with one row for each run.
+    """
+    keys = list(dict.fromkeys(key for run in summary for key in run['keys']))
+    table = {
+        'logfile': np.array([run['logfile'] for run in summary], dtype=str),
+        'run': np.array([run['run'] for run in summary], dtype=np.int64),
+        'rows': np.array([run['rows'] for run in summary], dtype=np.int64),
+    }
+    for key in keys:
+        for name in SUMMARY_STATS:
+            table[f'{key}_{name}'] = np.array([
+                run['stats'][key][name] if key in run['stats'] else np.nan
+                for run in summary
+            ], dtype=float)
+    return table
+
+
+def write_summary(basename, table):
+    """Store the summary table as CSV and as a npz file."""
+    names = list(table)
+    print('Writing file "{}.csv"'.format(basename))
+    with open(f'{basename}.csv', 'w', newline='') as output:
+        writer = csv.writer(output)
+        writer.writerow(names)
+        for i in range(len(table['logfile'])):
+            writer.writerow([
+                repr(table[key][i].item())
+                if table[key].dtype.kind == 'f' else table[key][i]
+                for key in names
+            ])
+    print('Writing file "{}.npz"'.format(basename))
+    with open(f'{basename}.npz', 'wb') as output:
+        np.savez(output, **table)
+
+
+def create_parser():
+    """Create a parser."""
+    parser = argparse.ArgumentParser(
+        description='Summarize the thermo output in many LAMMPS logs'
+    )
+    parser.add_argument(
+        'patterns',
+        help='Log files, or patterns like "runs/*/log.lammps"',
+        nargs='+',
+    )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        help='Number of worker processes',
+        type=int,
+        required=False,
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        help='Name for the output files (without .csv and .npz)',
+        default='summary',
+    )
+    return parser
+
+
+def main(args):
+    """Summarize the log files and store the table."""
+    logfiles = []
+    for pattern in args.patterns:
+        logfiles.extend(sorted(glob.glob(pattern, recursive=True)))
+    logfiles = list(dict.fromkeys(logfiles))
+    if not logfiles:
+        print('No log files found.')
+        return
+    print(f'Log files: {len(logfiles)}')
+    summary = summarize_logs(logfiles, workers=args.workers)
+    print(f'Runs: {len(summary)}')
+    write_summary(args.output, summary_table(summary))
+
+
+if __name__ == '__main__':
+    main(create_parser().parse_args())
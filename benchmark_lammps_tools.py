@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+"""Benchmark the parsers on synthetic LAMMPS files.
+
+Each benchmark runs in a new process so that the peak memory (resident
+set size) is measured for the benchmark alone. The results are stored
+as JSON, and a previous result file can be given to compare with.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import json
+import multiprocessing
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from average_lammps_profile import read_lammps_profile
+from average_lammps_rdf import read_lammps_profile as read_lammps_rdf
+from binary_lammpstrj import read_binary_dump
+from generate_lammps_files import DUMP_COLUMNS, write_all
+from read_lammps_data import read_data_file
+from read_lammps_log import read_lammps_log, read_lammps_log_arrays
+from read_lammpstrj import (
+    frame_to_dict,
+    iter_frames_reused,
+    read_frame,
+    read_lammpstrj,
+)
+from skip_lammpstrj import skip_frames
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def peak_rss():
+    """Return the peak resident set size of this process, in MB."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':  # bytes on macOS, kilobytes elsewhere
+        return rss / 1024**2
+    return rss / 1024
+
+
+def bench_read_lammpstrj(files):
+    """Iterate over the frames of a trajectory."""
+    return sum(1 for _ in read_lammpstrj(files['dump']))
+
+
+def bench_frame_to_dict(files):
+    """Convert frames (already read as lines) to dictionaries."""
+    frames = list(read_lammpstrj(files['dump']))
+    start = time.perf_counter()
+    for frame in frames:
+        frame_to_dict(frame)
+    return len(frames), time.perf_counter() - start
+
+
+def bench_read_frame(files):
+    """Convert frames (already read as lines) to Frame objects."""
+    frames = list(read_lammpstrj(files['dump']))
+    start = time.perf_counter()
+    for frame in frames:
+        read_frame(frame)
+    return len(frames), time.perf_counter() - start
+
+
+def bench_iter_frames_reused(files):
+    """Read the frames of a trajectory into reused arrays."""
+    return sum(1 for _ in iter_frames_reused(files['dump']))
+
+
+def bench_read_binary_dump(files):
+    """Iterate over the frames of a binary dump."""
+    return sum(1 for _ in read_binary_dump(files['binary']))
+
+
+def bench_skip_lammpstrj(files):
+    """Write every 10th frame of a trajectory to a new file."""
+    outfile = files['dump'].with_name('skip.lammpstrj')
+    frames, _ = skip_frames(files['dump'], outfile, 10)
+    outfile.unlink()
+    return frames
+
+
+def bench_read_lammps_log(files):
+    """Read the thermo output from a log file."""
+    return sum(len(data) for _, data in read_lammps_log(files['log']))
+
+
+def bench_read_lammps_log_arrays(files):
+    """Read the thermo output from a log file into arrays."""
+    return sum(len(data) for _, data in read_lammps_log_arrays(files['log']))
+
+
+def bench_read_lammps_profile(files):
+    """Read the profiles written by fix ave/chunk."""
+    return sum(1 for _ in read_lammps_profile(files['profile']))
+
+
+def bench_read_lammps_rdf(files):
+    """Read the RDFs written by fix ave/time."""
+    return sum(1 for _ in read_lammps_rdf(files['rdf']))
+
+
+def bench_read_data_file(files):
+    """Read a data file."""
+    return len(read_data_file(files['data'])['atoms'])
+
+
+# The benchmarks, the file they read and what they count:
+BENCHMARKS = {
+    'read_lammpstrj': (bench_read_lammpstrj, 'dump', 'frames'),
+    'frame_to_dict': (bench_frame_to_dict, 'dump', 'frames'),
+    'read_frame': (bench_read_frame, 'dump', 'frames'),
+    'iter_frames_reused': (bench_iter_frames_reused, 'dump', 'frames'),
+    'read_binary_dump': (bench_read_binary_dump, 'binary', 'frames'),
+    'skip_lammpstrj': (bench_skip_lammpstrj, 'dump', 'frames'),
+    'read_lammps_log': (bench_read_lammps_log, 'log', 'lines'),
+    'read_lammps_log_arrays': (bench_read_lammps_log_arrays, 'log', 'lines'),
+    'read_lammps_profile': (bench_read_lammps_profile, 'profile', 'blocks'),
+    'read_lammps_rdf': (bench_read_lammps_rdf, 'rdf', 'blocks'),
+    'read_data_file': (bench_read_data_file, 'data', 'atoms'),
+}
+
+
+def run_benchmark(name, files, repeat=3):
+    """Run a benchmark and measure the time and the peak memory.
+
+    The best time of the repeats is used. The parsers are imported
+    with this module, so the time of the imports is not included.
+    Errors are not caught: a benchmark which fails stops the run.
+    """
+    function, kind, unit = BENCHMARKS[name]
+    size = os.path.getsize(files[kind])
+    result = {'name': name, 'unit': unit, 'megabytes': size / 1024**2,
+              'rss_start_mb': peak_rss()}
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = function(files)
+        seconds = time.perf_counter() - start
+        if isinstance(count, tuple):
+            count, seconds = count
+        best = min(best, seconds)
+    result.update({
+        'seconds': best,
+        'count': count,
+        'per_second': count / best if best > 0 else None,
+        'mb_per_second': result['megabytes'] / best if best > 0 else None,
+        'peak_rss_mb': peak_rss(),
+    })
+    return result
+
+
+def run_isolated(name, files, repeat=3):
+    """Run a benchmark in a new process."""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_benchmark, name, files, repeat).result()
+
+
+def git_version():
+    """Get the current git commit, if available."""
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=pathlib.Path(__file__).parent, capture_output=True,
+            text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(names=None, natoms=1000, nframes=100, columns=DUMP_COLUMNS,
+            nsteps=100000, repeat=3, workdir=None):
+    """Generate the files and run the benchmarks.
+
+    Returns
+    -------
+    out : dict
+        Information about the run and a list with the results of the
+        benchmarks.
+    """
+    names = list(BENCHMARKS) if names is None else names
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        files = write_all(tmp, natoms=natoms, nframes=nframes,
+                          columns=columns, nsteps=nsteps)
+        results = []
+        for name in names:
+            result = run_isolated(name, files, repeat=repeat)
+            print_result(result)
+            results.append(result)
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'version': git_version(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'settings': {
+            'atoms': natoms, 'frames': nframes, 'columns': list(columns),
+            'steps': nsteps, 'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def print_result(result, old=None):
+    """Print the result of a benchmark."""
+    text = (
+        f'{result["name"]:20s} {result["seconds"]:9.4f} s '
+        f'{result["per_second"]:12.1f} {result["unit"]}/s '
+        f'{result["mb_per_second"]:9.2f} MB/s'
+    )
+    if result['peak_rss_mb'] is not None:
+        text += f' {result["peak_rss_mb"]:8.1f} MB RSS'
+    if old is not None and old.get('seconds'):
+        text += f' ({old["seconds"] / result["seconds"]:.2f}x)'
+    print(text)
+
+
+def compare_results(new, old):
+    """Print the results with the speedup relative to an old run."""
+    print(f'Compared to version {old.get("version")} ({old.get("date")}):')
+    old_results = {i['name']: i for i in old['results']}
+    for result in new['results']:
+        print_result(result, old=old_results.get(result['name']))
+
+
+def create_parser():
+    """Create a parser."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark the parsers on synthetic LAMMPS files'
+    )
+    parser.add_argument(
+        '-b',
+        '--benchmarks',
+        help='Benchmarks to run, for instance "read_lammpstrj,frame_to_dict"',
+        required=False,
+    )
+    parser.add_argument(
+        '-a',
+        '--atoms',
+        help='Number of atoms in the trajectory and data file',
+        type=int,
+        default=1000,
+    )
+    parser.add_argument(
+        '-f',
+        '--frames',
+        help='Number of frames (and profiles and RDFs)',
+        type=int,
+        default=100,
+    )
+    parser.add_argument(
+        '-c',
+        '--columns',
+        help='Atom columns in the trajectory',
+        default=','.join(DUMP_COLUMNS),
+    )
+    parser.add_argument(
+        '-s',
+        '--steps',
+        help='Number of thermo lines in the log file',
+        type=int,
+        default=100000,
+    )
+    parser.add_argument(
+        '-r',
+        '--repeat',
+        help='Number of times to run each benchmark',
+        type=int,
+        default=3,
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        help='JSON file to store the results in',
+        default='benchmark.json',
+    )
+    parser.add_argument(
+        '--compare',
+        help='JSON file with results to compare with',
+        required=False,
+    )
+    return parser
+
+
+def main(args):
+    """Run the benchmarks and store the results."""
+    names = None
+    if args.benchmarks is not None:
+        names = args.benchmarks.split(',')
+        for name in names:
+            if name not in BENCHMARKS:
+                raise ValueError(f'Unknown benchmark "{name}"')
+    result = run_all(names=names, natoms=args.atoms, nframes=args.frames,
+                     columns=args.columns.split(','), nsteps=args.steps,
+                     repeat=args.repeat)
+    print('Writing file "{}"'.format(args.output))
+    with open(args.output, 'w') as output:
+        json.dump(result, output, indent=2)
+    if args.compare is not None:
+        with open(args.compare, 'r') as infile:
+            compare_results(result, json.load(infile))
+
+
+if __name__ == '__main__':
+    main(create_parser().parse_args())
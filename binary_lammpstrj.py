@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+"""Read trajectories written by LAMMPS in the binary dump format.
+
+LAMMPS writes binary dumps (``dump ... binary yes``, or a file name
+ending with ``.bin``) as a header for each frame followed by the atom
+data from each processor: the number of values in the chunk and the
+values as doubles. Newer versions of LAMMPS start the header with a
+magic string and also store the units, the time and the column names.
+
+The atom data is read straight into NumPy arrays, and frames are given
+as :py:class:`read_lammpstrj.Frame` objects, like the frames read from
+lammpstrj files. The frames can also be indexed (see
+``index_lammpstrj.py``) for random access.
+"""
+import argparse
+import os
+import pathlib
+import struct
+import numpy as np
+from index_lammpstrj import IndexedTrajectory, load_frame_index
+from read_lammpstrj import (
+    INTEGER_COLUMNS,
+    Frame,
+    compression_format,
+    open_trajectory,
+    select_atoms,
+    write_gro_trajectory,
+)
+
+
+BINARY_SUFFIX = '.bin'
+# The boundary flags, in the order LAMMPS numbers them:
+BOUNDARY_FLAGS = 'pfsm'
+ENDIAN = 0x0001
+
+
+def is_binary_dump(lmp):
+    """Check if a file is a binary dump, from its suffix."""
+    lmp = pathlib.Path(lmp)
+    if compression_format(lmp) is not None:
+        lmp = lmp.with_suffix('')
+    return lmp.suffix.lower() == BINARY_SUFFIX
+
+
+def _unpack(infile, fmt):
+    """Read values with the given struct format from a file."""
+    size = struct.calcsize(fmt)
+    raw = infile.read(size)
+    if len(raw) < size:
+        raise EOFError('Incomplete frame in binary dump')
+    return struct.unpack(fmt, raw)
+
+
+def read_binary_header(infile):
+    """Read the header of the frame starting at the current position.
+
+    Returns
+    -------
+    out : dict or None
+        The header items, or None at the end of the file. ``columns``,
+        ``units`` and ``time`` are None when they are not in the file.
+        ``nchunk`` is the number of chunks of atom data which follow.
+    """
+    raw = infile.read(8)
+    if not raw:
+        return None
+    if len(raw) < 8:
+        raise EOFError('Incomplete frame in binary dump')
+    timestep, = struct.unpack('<q', raw)
+    header = {'magic': None, 'units': None, 'time': None, 'columns': None}
+    revision = 1
+    if timestep < 0:
+        # Newer format: a negative length for the magic string.
+        header['magic'] = infile.read(-timestep).decode('ascii')
+        endian, revision = _unpack(infile, '<ii')
+        if endian != ENDIAN:
+            raise ValueError('The binary dump has a different byte order')
+        timestep, = _unpack(infile, '<q')
+    header['timestep'] = timestep
+    header['natoms'], triclinic = _unpack(infile, '<qi')
+    header['boundary'] = _unpack(infile, '<6i')
+    header['box'] = _unpack(infile, '<9d' if triclinic else '<6d')
+    header['triclinic'] = bool(triclinic)
+    header['size_one'], = _unpack(infile, '<i')
+    if header['magic'] is not None and revision > 1:
+        length, = _unpack(infile, '<i')
+        if length > 0:
+            header['units'] = infile.read(length).decode('ascii')
+        if infile.read(1) != b'\x00':
+            header['time'], = _unpack(infile, '<d')
+        length, = _unpack(infile, '<i')
+        header['columns'] = infile.read(length).decode('ascii').split()
+    header['nchunk'], = _unpack(infile, '<i')
+    return header
+
+
+def binary_bounds(header):
+    """Get the boundary conditions as they are written in text dumps."""
+    flags = header['boundary']
+    bounds = [
+        BOUNDARY_FLAGS[flags[i]] + BOUNDARY_FLAGS[flags[i + 1]]
+        for i in range(0, 6, 2)
+    ]
+    if header['triclinic']:
+        bounds = ['xy', 'xz', 'yz'] + bounds
+    return tuple(bounds)
+
+
+def binary_columns(header, names=None):
+    """Get the names of the atom columns for a frame.
+
+    The names are taken from the header when present, otherwise from
+    ``names``, or ``c1``, ``c2``, ... are used.
+    """
+    if header['columns']:
+        return header['columns']
+    if names is not None:
+        if len(names) != header['size_one']:
+            raise ValueError(
+                f'Expected {header["size_one"]} column names, got '
+                f'{len(names)}'
+            )
+        return list(names)
+    return [f'c{i + 1}' for i in range(header['size_one'])]
+
+
+def read_binary_atoms(infile, header):
+    """Read the atom data following a header into a 2D array.
+
+    The chunks are read directly into the array.
+    """
+    size = header['natoms'] * header['size_one']
+    values = np.empty(size, dtype='<f8')
+    buff = values.view(np.uint8)
+    pos = 0
+    for _ in range(header['nchunk']):
+        count, = _unpack(infile, '<i')
+        if pos + count > size:
+            raise ValueError('Inconsistent data length for atoms')
+        nbytes = count * values.itemsize
+        if infile.readinto(buff[pos * 8:pos * 8 + nbytes]) != nbytes:
+            raise EOFError('Incomplete frame in binary dump')
+        pos += count
+    if pos != size:
+        raise ValueError('Inconsistent data length for atoms')
+    return values.reshape(header['natoms'], header['size_one'])
+
+
+def binary_atom_table(values, keys, columns=None, select=None):
+    """Store the atom data in a structured array.
+
+    Columns in ``INTEGER_COLUMNS`` are converted to integers. The
+    columns and the selection are given as for
+    :py:func:`read_lammpstrj.frame_to_dict`.
+    """
+    if columns is None:
+        columns = keys
+    for key in list(columns) + list(select or ()):
+        if key not in keys:
+            raise KeyError(f'Column "{key}" not found in the atom data')
+    if select:
+        mask = select_atoms(
+            {key: values[:, keys.index(key)] for key in select}, select
+        )
+        values = values[mask]
+    table = np.empty(len(values), dtype=[
+        (key, np.int64 if key in INTEGER_COLUMNS else np.float64)
+        for key in columns
+    ])
+    for key in columns:
+        table[key] = values[:, keys.index(key)]
+    return table
+
+
+def read_binary_frame(infile, columns=None, select=None, names=None):
+    """Read the frame starting at the current position of a file.
+
+    Parameters
+    ----------
+    infile : file object
+        The binary dump, opened for reading bytes.
+    columns : list of strings, optional
+        The atom columns to keep, the default is all columns.
+    select : dict, optional
+        Criteria for selecting atoms, see
+        :py:func:`read_lammpstrj.select_atoms`.
+    names : list of strings, optional
+        Names for the atom columns, used if they are not stored in
+        the file (older versions of LAMMPS).
+
+    Returns
+    -------
+    out : object like read_lammpstrj.Frame or None
+        The frame, or None at the end of the file.
+    """
+    header = read_binary_header(infile)
+    if header is None:
+        return None
+    values = read_binary_atoms(infile, header)
+    keys = binary_columns(header, names=names)
+    atoms = binary_atom_table(values, keys, columns=columns, select=select)
+    extra = {}
+    if header['units'] is not None:
+        extra['units'] = [header['units']]
+    if header['time'] is not None:
+        extra['time'] = [repr(header['time'])]
+    return Frame(header['timestep'], len(atoms), np.array(header['box']),
+                 binary_bounds(header), atoms, extra=extra or None)
+
+
+def read_binary_dump(lmp, columns=None, select=None, names=None):
+    """Iterate over the frames in a binary dump.
+
+    The parameters are as for :py:func:`.read_binary_frame`. An
+    incomplete frame at the end of the file (for instance, when LAMMPS
+    is still writing it) is left out.
+
+    Yields
+    ------
+    out : object like read_lammpstrj.Frame
+        The frames.
+    """
+    with open_trajectory(lmp, 'rb') as infile:
+        while True:
+            try:
+                frame = read_binary_frame(infile, columns=columns,
+                                          select=select, names=names)
+            except EOFError:
+                break
+            if frame is None:
+                break
+            yield frame
+
+
+def scan_binary_frames(infile, size):
+    """Locate the complete frames in a binary dump.
+
+    Only the headers are read, the atom data is skipped over.
+
+    Returns
+    -------
+    out : tuple
+        The offsets, timesteps and number of atoms for the frames, and
+        the end of the last complete frame.
+    """
+    offsets, timesteps, natoms, stop = [], [], [], 0
+    while True:
+        start = infile.tell()
+        try:
+            header = read_binary_header(infile)
+            if header is None:
+                break
+            for _ in range(header['nchunk']):
+                count, = _unpack(infile, '<i')
+                infile.seek(count * 8, os.SEEK_CUR)
+        except EOFError:
+            break
+        if infile.tell() > size:
+            break
+        offsets.append(start)
+        timesteps.append(header['timestep'])
+        natoms.append(header['natoms'])
+        stop = infile.tell()
+    return offsets, timesteps, natoms, stop
+
+
+def build_binary_index(lmp):
+    """Create the frame index for a binary dump.
+
+    The index has the same items as the one created by
+    :py:func:`index_lammpstrj.build_frame_index`.
+    """
+    if compression_format(lmp) is not None:
+        raise ValueError('Compressed binary dumps can not be indexed')
+    with open(lmp, 'rb') as infile:
+        stat = os.fstat(infile.fileno())
+        offsets, timesteps, natoms, stop = scan_binary_frames(
+            infile, stat.st_size
+        )
+    return {
+        'offset': np.array(offsets + [stop], dtype=np.int64),
+        'timestep': np.array(timesteps, dtype=np.int64),
+        'natoms': np.array(natoms, dtype=np.int64),
+        'size': np.int64(stat.st_size),
+        'mtime': np.int64(stat.st_mtime_ns),
+    }
+
+
+class BinaryTrajectory(IndexedTrajectory):
+    """Random access to the frames of a binary dump.
+
+    This works as :py:class:`index_lammpstrj.IndexedTrajectory`, and
+    the index is stored in the same kind of sidecar file. The column
+    names for older binary dumps can be given with ``names``, see
+    :py:func:`.read_binary_frame`. The frames are always given as
+    :py:class:`read_lammpstrj.Frame` objects.
+    """
+
+    def __init__(self, lmp, rebuild=False, columns=None, select=None,
+                 names=None):
+        """Set up the trajectory and load (or create) the index."""
+        self.filename = pathlib.Path(lmp)
+        self.index = load_frame_index(self.filename, rebuild=rebuild,
+                                      build=build_binary_index)
+        self.columns = columns
+        self.select = select
+        self.names = names
+        self.as_frame = True
+        self._handle = None
+
+    def __getitem__(self, i):
+        """Return frame number i."""
+        i = self._position(i)
+        if self._handle is None:
+            self._handle = open(self.filename, 'rb')
+        self._handle.seek(int(self.index['offset'][i]))
+        return read_binary_frame(self._handle, columns=self.columns,
+                                 select=self.select, names=self.names)
+
+    def raw_frame(self, i):
+        """Binary dumps have no text frames."""
+        raise TypeError('Frames in binary dumps can not be read as text')
+
+
+def binary_to_gro(lmp, outputfile, atom_names=None, names=None):
+    """Convert all frames in a binary dump to a gro file."""
+    frames = read_binary_dump(lmp, names=names)
+    return write_gro_trajectory(outputfile, frames, atom_names=atom_names)
+
+
+def create_parser():
+    """Create a parser."""
+    parser = argparse.ArgumentParser(
+        description='Index a LAMMPS binary dump and print a summary'
+    )
+    parser.add_argument('infile', help='Binary dump to read')
+    parser.add_argument(
+        '-n',
+        '--names',
+        help=('Names of the atom columns, for dumps which do not store '
+              'them, for instance "id,type,x,y,z"'),
+        required=False,
+    )
+    parser.add_argument(
+        '-g',
+        '--gro',
+        help='Also write all frames to this gro file',
+        required=False,
+    )
+    return parser
+
+
+def main(args):
+    """Index a binary dump, print a summary and convert it if asked."""
+    names = None if args.names is None else args.names.split(',')
+    with BinaryTrajectory(args.infile, rebuild=True, names=names) as traj:
+        print(f'Frames: {len(traj)}')
+        if len(traj) > 0:
+            print(f'First timestep: {traj.timesteps[0]}')
+            print(f'Last timestep: {traj.timesteps[-1]}')
+            print(f'Columns: {" ".join(traj[0].atoms.dtype.names)}')
+    if args.gro is not None:
+        print('Writing file "{}"'.format(args.gro))
+        binary_to_gro(args.infile, args.gro, names=names)
+
+
+if __name__ == '__main__':
+    main(create_parser().parse_args())
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+"""Convert a lammpstrj file to a columnar binary cache.
+
+The cache is a directory (``<trajectory>.cache``) holding one ``.npy``
+file for each atom column, with the atoms of all frames stored after
+each other, together with the timestep, number of atoms and box of
+each frame. Frames read from the cache are views into memory mapped
+arrays, so no text is parsed and no data is copied.
+"""
+import json
+import os
+import pathlib
+import sys
+import numpy as np
+from index_lammpstrj import load_frame_index
+from read_lammpstrj import (
+    BOX_KEYS,
+    INTEGER_COLUMNS,
+    read_lammpstrj,
+    frame_to_dict,
+)
+
+
+CACHE_SUFFIX = '.cache'
+
+
+def cache_path(lmp):
+    """Return the path to the cache directory for a lammpstrj file."""
+    lmp = pathlib.Path(lmp)
+    return lmp.with_name(f'{lmp.name}{CACHE_SUFFIX}')
+
+
+def box_to_array(box):
+    """Store box information as an array, missing tilts are nan."""
+    return np.array([box.get(key, np.nan) for key in BOX_KEYS])
+
+
+def array_to_box(values, bounds):
+    """Convert a stored box array back to a box dictionary."""
+    box = {'bounds': list(bounds)}
+    for key, val in zip(BOX_KEYS, values):
+        if not np.isnan(val):
+            box[key] = float(val)
+    return box
+
+
+def column_dtype(key, values):
+    """Choose the data type for storing an atom column in the cache.
+
+    Numeric columns are stored as floats, unless they are known to
+    hold integers (``INTEGER_COLUMNS``). The type guessed from the
+    first frame can not be used: LAMMPS writes, for instance, zero
+    velocities as "0", which looks like an integer column.
+    """
+    if values.dtype.kind not in 'biuf':
+        return values.dtype
+    return np.int64 if key in INTEGER_COLUMNS else np.float64
+
+
+def write_cache(lmp, cache_dir=None):
+    """Write the columnar cache for a lammpstrj file.
+
+    Parameters
+    ----------
+    lmp : string or pathlib.Path
+        The trajectory to convert.
+    cache_dir : string or pathlib.Path, optional
+        Where to store the cache. The default is given by
+        :py:func:`.cache_path`.
+
+    Returns
+    -------
+    out : pathlib.Path
+        The directory with the cache.
+    """
+    lmp = pathlib.Path(lmp)
+    if cache_dir is None:
+        cache_dir = cache_path(lmp)
+    cache_dir = pathlib.Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    meta_file = cache_dir.joinpath('meta.json')
+    if meta_file.is_file():
+        meta_file.unlink()
+
+    index = load_frame_index(lmp)
+    natoms = index['natoms']
+    nframes = len(natoms)
+    atom_offset = np.zeros(nframes + 1, dtype=np.int64)
+    np.cumsum(natoms, out=atom_offset[1:])
+    box = np.full((nframes, len(BOX_KEYS)), np.nan)
+    timestep = index['timestep']
+
+    columns = None
+    meta = {
+        'source': str(lmp.resolve()),
+        'size': int(index['size']),
+        'mtime': int(index['mtime']),
+        'bounds': [],
+        'columns': [],
+    }
+    frames = read_lammpstrj(lmp)
+    for i, frame in zip(range(nframes), frames):
+        data = frame_to_dict(frame)
+        atoms = data['atoms']
+        if columns is None:
+            columns = {}
+            for j, (key, val) in enumerate(atoms.items()):
+                filename = f'column-{j}.npy'
+                columns[key] = np.lib.format.open_memmap(
+                    cache_dir.joinpath(filename),
+                    mode='w+',
+                    dtype=column_dtype(key, val),
+                    shape=(int(atom_offset[-1]),),
+                )
+                meta['columns'].append([key, filename])
+            meta['bounds'] = data['box']['bounds']
+        if list(atoms.keys()) != list(columns.keys()):
+            raise ValueError(f'Columns changed in frame {i}')
+        start, end = atom_offset[i], atom_offset[i + 1]
+        for key, val in atoms.items():
+            if len(val) != end - start:
+                raise ValueError(f'Inconsistent data length in frame {i}')
+            if not np.can_cast(val.dtype, columns[key].dtype):
+                raise ValueError(
+                    f'Column "{key}" in frame {i} can not be stored as '
+                    f'{columns[key].dtype}'
+                )
+            columns[key][start:end] = val
+        box[i] = box_to_array(data['box'])
+    frames.close()
+    if columns is not None:
+        for column in columns.values():
+            column.flush()
+    np.savez(
+        cache_dir.joinpath('frames.npz'),
+        timestep=timestep,
+        natoms=natoms,
+        atom_offset=atom_offset,
+        box=box,
+    )
+    # The metadata is written last, it marks the cache as complete:
+    with open(meta_file, 'w') as output:
+        json.dump(meta, output, indent=2)
+    return cache_dir
+
+
+def cache_is_valid(lmp, cache_dir=None):
+    """Check if a cache exists and matches the trajectory file."""
+    if cache_dir is None:
+        cache_dir = cache_path(lmp)
+    meta_file = pathlib.Path(cache_dir).joinpath('meta.json')
+    if not meta_file.is_file():
+        return False
+    with open(meta_file, 'r') as infile:
+        meta = json.load(infile)
+    stat = os.stat(lmp)
+    return meta['size'] == stat.st_size and meta['mtime'] == stat.st_mtime_ns
+
+
+class TrajectoryCache:
+    """Read frames from a columnar cache.
+
+    Frames are given as dictionaries in the same form as
+    :py:func:`read_lammpstrj.frame_to_dict`, but the arrays for the
+    atoms are read-only memory mapped views.
+    """
+
+    def __init__(self, cache_dir):
+        """Open the cache stored in the given directory."""
+        self.cache_dir = pathlib.Path(cache_dir)
+        with open(self.cache_dir.joinpath('meta.json'), 'r') as infile:
+            self.meta = json.load(infile)
+        with np.load(self.cache_dir.joinpath('frames.npz')) as npz:
+            self.timestep = npz['timestep']
+            self.natoms = npz['natoms']
+            self.atom_offset = npz['atom_offset']
+            self.box = npz['box']
+        self.columns = {
+            key: np.load(self.cache_dir.joinpath(filename), mmap_mode='r')
+            for key, filename in self.meta['columns']
+        }
+
+    def __len__(self):
+        """Return the number of frames."""
+        return len(self.timestep)
+
+    def __getitem__(self, i):
+        """Return frame number i."""
+        length = len(self)
+        if not -length <= i < length:
+            raise IndexError(f'Frame {i} is out of range ({length} frames)')
+        i %= length
+        start, end = self.atom_offset[i], self.atom_offset[i + 1]
+        return {
+            'timestep': int(self.timestep[i]),
+            'number of atoms': int(self.natoms[i]),
+            'box': array_to_box(self.box[i], self.meta['bounds']),
+            'atoms': {
+                key: val[start:end] for key, val in self.columns.items()
+            },
+        }
+
+    def __iter__(self):
+        """Iterate over all frames."""
+        for i in range(len(self)):
+            yield self[i]
+
+
+def load_cache(lmp, rebuild=False):
+    """Open the cache for a trajectory, creating it if needed."""
+    if rebuild or not cache_is_valid(lmp):
+        write_cache(lmp)
+    return TrajectoryCache(cache_path(lmp))
+
+
+def main(infile):
+    """Create the cache for a lammpstrj file."""
+    cache = load_cache(infile, rebuild=True)
+    print(f'Cache: {cache.cache_dir}')
+    print(f'Frames: {len(cache)}')
+    print('Columns:')
+    for key, val in cache.columns.items():
+        print(f'- {key} ({val.dtype})')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+"""Calculate time correlations from a lammpstrj file.
+
+The mean squared displacement (MSD) and the velocity autocorrelation
+function (VACF) are calculated for each atom type with the FFT
+algorithm, which scales as O(N log N) with the number of frames.
+
+To limit the memory used, the trajectory can be processed in blocks
+of frames (correlations are then only calculated for lags shorter
+than a block) and in passes over subsets of the atoms.
+"""
+import argparse
+import pathlib
+import numpy as np
+from array_lammpstrj import (
+    IMAGES,
+    atom_columns,
+    coordinate_columns,
+    read_trajectory_arrays,
+)
+from index_lammpstrj import IndexedTrajectory
+
+
+def autocorrelation_sum(data):
+    """Sum the products of data separated by each lag, using FFT.
+
+    Parameters
+    ----------
+    data : numpy.array
+        The data with time along the first axis, for instance with
+        shape ``(n_frames, n_atoms, 3)``.
+
+    Returns
+    -------
+    out : numpy.array
+        The sums over time origins, ``sum_k data[k] * data[k + m]``,
+        for each lag ``m``, summed over the last axis.
+    """
+    length = len(data)
+    fft = np.fft.rfft(data, n=2 * length, axis=0)
+    corr = np.fft.irfft(fft * fft.conjugate(), n=2 * length, axis=0)
+    return corr[:length].sum(axis=-1)
+
+
+def msd_sum(positions):
+    """Sum squared displacements over time origins, using FFT.
+
+    Parameters
+    ----------
+    positions : numpy.array
+        The unwrapped positions with shape ``(n_frames, n_atoms, 3)``.
+
+    Returns
+    -------
+    out : numpy.array
+        The squared displacements for each lag and atom, summed over
+        the time origins, with shape ``(n_frames, n_atoms)``.
+    """
+    length = len(positions)
+    sq_sum = np.sum(positions**2, axis=-1)
+    cumulative = np.zeros((length + 1,) + sq_sum.shape[1:])
+    np.cumsum(sq_sum, axis=0, out=cumulative[1:])
+    lag = np.arange(length)
+    # Sum of |r(k)|^2 + |r(k + m)|^2 over the origins k:
+    sum1 = cumulative[length - lag] + cumulative[length] - cumulative[lag]
+    return sum1 - 2.0 * autocorrelation_sum(positions)
+
+
+def sum_by_type(values, types, all_types):
+    """Sum values over the atoms of each type."""
+    return {
+        i: values[:, types == i].sum(axis=1) for i in all_types
+    }
+
+
+def time_correlations(lmp, block_size=None, atoms_per_pass=None,
+                      unwrap=None, msd=True, vacf=None):
+    """Calculate the MSD and VACF for each atom type.
+
+    Parameters
+    ----------
+    lmp : string or pathlib.Path
+        The trajectory to read, the frames should be equally spaced
+        in time and the atoms should not change.
+    block_size : integer, optional
+        The number of frames in each block. Correlations are
+        calculated for lags shorter than a block and averaged over the
+        blocks. The default is to use all frames as one block.
+    atoms_per_pass : integer, optional
+        The number of atoms to read in each pass over the trajectory.
+        The default is to read all atoms in one pass.
+    unwrap : string, optional
+        How to unwrap the positions, see
+        :py:func:`array_lammpstrj.read_trajectory_arrays`. The
+        default is to use the image flags when present.
+    msd : boolean, optional
+        If True, the MSD is calculated.
+    vacf : boolean, optional
+        If True, the VACF is calculated. The default is to calculate
+        it if the velocities are in the dump.
+
+    Returns
+    -------
+    out : dict
+        ``lag`` (in frames), ``time`` (in timesteps), and ``msd`` and
+        ``vacf`` as dictionaries with one array for each atom type.
+    """
+    with IndexedTrajectory(lmp, columns=['id', 'type']) as traj:
+        nframes = len(traj)
+        timesteps = traj.timesteps
+        keys = atom_columns(traj.raw_frame(0))
+        first = traj[0]['atoms']
+    if unwrap is None:
+        _, _, unwrapped = coordinate_columns(keys)
+        if unwrapped or all(i in keys for i in IMAGES):
+            unwrap = 'image'
+        else:
+            unwrap = 'continuous'
+    if vacf is None:
+        vacf = all(i in keys for i in ('vx', 'vy', 'vz'))
+    if block_size is None or block_size > nframes:
+        block_size = nframes
+    if atoms_per_pass is None:
+        atoms_per_pass = len(first['id'])
+    all_types = np.unique(first['type'])
+    natoms = {i: np.count_nonzero(first['type'] == i) for i in all_types}
+    ids = np.sort(first['id'])
+    sums = {
+        'msd': {i: np.zeros(block_size) for i in all_types},
+        'vacf': {i: np.zeros(block_size) for i in all_types},
+    }
+    origins = np.zeros(block_size)
+    # The blocks are read from one open trajectory, so that reading
+    # continues from the previous block:
+    traj = IndexedTrajectory(lmp)
+    for pass_start in range(0, len(ids), atoms_per_pass):
+        pass_ids = ids[pass_start:pass_start + atoms_per_pass]
+        select = {'id': (pass_ids[0], pass_ids[-1])}
+        for start in range(0, nframes, block_size):
+            arrays = read_trajectory_arrays(
+                traj, start, start + block_size, unwrap=unwrap,
+                select=select, velocities=vacf,
+            )
+            length = len(arrays['timestep'])
+            if pass_start == 0:
+                origins[:length] += np.arange(length, 0, -1)
+            if msd:
+                for i, val in sum_by_type(msd_sum(arrays['positions']),
+                                          arrays['type'], all_types).items():
+                    sums['msd'][i][:length] += val
+            if vacf:
+                corr = autocorrelation_sum(arrays['velocities'])
+                for i, val in sum_by_type(corr, arrays['type'],
+                                          all_types).items():
+                    sums['vacf'][i][:length] += val
+    traj.close()
+    lag = np.arange(block_size)
+    result = {
+        'lag': lag,
+        'time': lag * (timesteps[1] - timesteps[0] if nframes > 1 else 0),
+    }
+    for key, selected in (('msd', msd), ('vacf', vacf)):
+        if selected:
+            result[key] = {
+                i: val / (origins * natoms[i]) for i, val in sums[key].items()
+            }
+    return result
+
+
+def write_correlations(filename, result):
+    """Store the correlations in a text file."""
+    header = ['#', 'lag', 'time']
+    columns = [result['lag'], result['time']]
+    for key in ('msd', 'vacf'):
+        for i, val in result.get(key, {}).items():
+            header.append(f'{key}_{i}')
+            columns.append(val)
+    print('Writing file "{}"'.format(filename))
+    np.savetxt(filename, np.column_stack(columns), header=' '.join(header))
+
+
+def main(infile, block_size=None, atoms_per_pass=None):
+    """Calculate the MSD and VACF for a trajectory and store them."""
+    print('Reading file "{}"'.format(infile))
+    result = time_correlations(infile, block_size=block_size,
+                               atoms_per_pass=atoms_per_pass)
+    write_correlations(
+        'correlation-{}.txt'.format(pathlib.Path(infile).stem), result
+    )
+
+
+def create_parser():
+    """Create a parser."""
+    parser = argparse.ArgumentParser(
+        description='Calculate MSD and VACF from a LAMMPS trajectory'
+    )
+    parser.add_argument('infile', help='Trajectory to read')
+    parser.add_argument(
+        '-b',
+        '--block',
+        help='Number of frames in each block',
+        type=int,
+        required=False,
+    )
+    parser.add_argument(
+        '-a',
+        '--atoms',
+        help='Number of atoms to read in each pass',
+        type=int,
+        required=False,
+    )
+    return parser
+
+
+if __name__ == '__main__':
+    ARGS = create_parser().parse_args()
+    main(ARGS.infile, block_size=ARGS.block, atoms_per_pass=ARGS.atoms)
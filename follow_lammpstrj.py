@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""Follow a lammpstrj file which is still being written by LAMMPS."""
+import os
+import pathlib
+import sys
+import time
+import numpy as np
+from read_lammpstrj import compression_format, frame_to_dict
+
+
+def _read_int_after(buff, marker, pos):
+    """Read the integer on the line after marker, searching from pos."""
+    start = buff.find(marker, pos)
+    if start == -1:
+        return None, -1
+    start = buff.find(b'\n', start) + 1
+    end = buff.find(b'\n', start)
+    if start == 0 or end == -1:
+        return None, -1
+    try:
+        return int(buff[start:end]), end
+    except ValueError:
+        return None, -1
+
+
+def frame_is_complete(buff, start):
+    """Check if the last frame, starting at start, has all its atoms.
+
+    Returns
+    -------
+    out : integer
+        The byte offset just after the last atom line of the frame, or
+        -1 if the frame is not complete yet. Data after this offset
+        (for instance, the start of the next frame) is not part of
+        the frame.
+    """
+    natoms, pos = _read_int_after(buff, b'ITEM: NUMBER OF ATOMS', start)
+    if natoms is None:
+        return -1
+    pos = buff.find(b'ITEM: ATOMS', pos)
+    if pos == -1:
+        return -1
+    pos = buff.find(b'\n', pos)
+    if pos == -1:
+        return -1
+    if natoms == 0:
+        return pos + 1
+    newlines = np.flatnonzero(
+        np.frombuffer(buff, dtype=np.uint8, offset=pos + 1) == ord('\n')
+    )
+    if len(newlines) < natoms:
+        return -1
+    return pos + 1 + int(newlines[natoms - 1]) + 1
+
+
+class TrajectoryFollower:
+    """Give the complete frames added to a trajectory since last time.
+
+    Attributes
+    ----------
+    offset : integer
+        The byte offset after the last frame given. A follower can be
+        resumed from here, for instance, after a restart of the
+        monitoring script.
+    """
+
+    def __init__(self, lmp, offset=0):
+        """Set up for reading frames, starting at the given offset."""
+        if compression_format(lmp) is not None:
+            raise ValueError('Can not follow a compressed trajectory')
+        self.filename = pathlib.Path(lmp)
+        self.offset = offset
+        self._read_pos = offset  # where to continue reading the file
+        self._buffer = bytearray()  # bytes after offset, not yet given
+
+    def poll(self):
+        """Read new data and return the new complete frames.
+
+        Returns
+        -------
+        out : list of lists of strings
+            The new frames, as lines, like
+            :py:func:`read_lammpstrj.read_lammpstrj` gives them.
+        """
+        try:
+            size = os.stat(self.filename).st_size
+        except FileNotFoundError:
+            return []
+        if size < self._read_pos:
+            print(f'"{self.filename}" was truncated, starting over.')
+            self.offset = 0
+            self._read_pos = 0
+            self._buffer = bytearray()
+        if size == self._read_pos:
+            return []
+        with open(self.filename, 'rb') as infile:
+            infile.seek(self._read_pos)
+            new_data = infile.read(size - self._read_pos)
+        self._read_pos += len(new_data)
+        self._buffer += new_data
+        return self._take_frames()
+
+    def _take_frames(self):
+        """Remove the complete frames from the buffer."""
+        marker = b'ITEM: TIMESTEP'
+        frames = []
+        buff = self._buffer
+        start = buff.find(marker)
+        while start != -1:
+            end = buff.find(marker, start + 1)
+            if end == -1:
+                end = frame_is_complete(buff, start)
+                if end == -1:
+                    break
+            raw = buff[start:end].decode('utf-8')
+            frames.append(raw.splitlines(keepends=True))
+            start = end if end < len(buff) else -1
+        done = len(buff) if start == -1 else start
+        if not frames and start == -1:
+            # No frame started, keep what could be the start of a marker:
+            done = max(len(buff) - len(marker) + 1, 0)
+        del buff[:done]
+        self.offset += done
+        return frames
+
+
+def follow_lammpstrj(lmp, interval=1.0, timeout=None, offset=0):
+    """Iterate over frames as they are written to a trajectory.
+
+    Parameters
+    ----------
+    lmp : string or pathlib.Path
+        The trajectory to follow.
+    interval : float, optional
+        The number of seconds to wait between checks for new data.
+    timeout : float, optional
+        Stop when no new frame has been found for this many seconds.
+        The default is to continue forever.
+    offset : integer, optional
+        The byte offset to start at.
+
+    Yields
+    ------
+    out : list of strings
+        The lines of each complete frame.
+    """
+    follower = TrajectoryFollower(lmp, offset=offset)
+    last = time.monotonic()
+    while True:
+        frames = follower.poll()
+        if frames:
+            last = time.monotonic()
+            yield from frames
+        elif timeout is not None and time.monotonic() - last > timeout:
+            return
+        else:
+            time.sleep(interval)
+
+
+def main(infile, interval=1.0):
+    """Print information about frames as they are written."""
+    for frame in follow_lammpstrj(infile, interval=interval):
+        data = frame_to_dict(frame)
+        print(data['timestep'], data['number of atoms'])
+
+
+if __name__ == '__main__':
+    try:
+        main(sys.argv[1], interval=float(sys.argv[2]))
+    except IndexError:
+        main(sys.argv[1])
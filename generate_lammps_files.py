@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+"""Create synthetic LAMMPS files for testing and benchmarking.
+
+The files have random contents, but the same layout as the files
+written by LAMMPS: trajectories (``dump atom/custom``, as text or
+binary), log files with thermo output, profiles (``fix ave/chunk``),
+RDFs (``fix ave/time`` with ``compute rdf``) and data files
+(``atom_style full``).
+"""
+import argparse
+import pathlib
+import struct
+import numpy as np
+
+
+# Columns which are written as integers in the trajectories:
+INTEGER_COLUMNS = {'id', 'type', 'mol', 'ix', 'iy', 'iz'}
+DUMP_COLUMNS = ('id', 'type', 'x', 'y', 'z', 'vx', 'vy', 'vz')
+THERMO_COLUMNS = ('Step', 'Temp', 'E_pair', 'E_mol', 'TotEng', 'Press')
+
+
+def dump_atoms(rng, natoms, columns, ntypes, length):
+    """Create random atom data for the given columns."""
+    data = np.zeros((natoms, len(columns)))
+    for i, key in enumerate(columns):
+        if key == 'id':
+            data[:, i] = rng.permutation(natoms) + 1
+        elif key in ('type', 'mol'):
+            data[:, i] = rng.integers(1, ntypes + 1, natoms)
+        elif key in ('ix', 'iy', 'iz'):
+            data[:, i] = rng.integers(-2, 3, natoms)
+        elif key in ('x', 'y', 'z', 'xu', 'yu', 'zu'):
+            data[:, i] = rng.random(natoms) * length
+        elif key in ('xs', 'ys', 'zs'):
+            data[:, i] = rng.random(natoms)
+        else:
+            data[:, i] = rng.normal(size=natoms)
+    return data
+
+
+def write_dump(filename, natoms=1000, nframes=10, columns=DUMP_COLUMNS,
+               ntypes=2, length=10.0, seed=0):
+    """Write a trajectory in the lammpstrj format.
+
+    Parameters
+    ----------
+    filename : string or pathlib.Path
+        The file to create.
+    natoms : integer, optional
+        The number of atoms in each frame.
+    nframes : integer, optional
+        The number of frames.
+    columns : list of strings, optional
+        The atom columns. Columns other than ids, types, image flags
+        and positions are filled with random numbers.
+    ntypes : integer, optional
+        The number of atom types.
+    length : float, optional
+        The length of the (cubic) box.
+    seed : integer, optional
+        Seed for the random numbers.
+    """
+    rng = np.random.default_rng(seed)
+    fmt = ['%d' if i in INTEGER_COLUMNS else '%.6g' for i in columns]
+    header = ' '.join(columns)
+    with open(filename, 'w') as output:
+        for step in range(nframes):
+            output.write(f'ITEM: TIMESTEP\n{step * 100}\n')
+            output.write(f'ITEM: NUMBER OF ATOMS\n{natoms}\n')
+            output.write('ITEM: BOX BOUNDS pp pp pp\n')
+            output.write(f'0.0 {length}\n' * 3)
+            output.write(f'ITEM: ATOMS {header}\n')
+            data = dump_atoms(rng, natoms, columns, ntypes, length)
+            np.savetxt(output, data, fmt=fmt)
+
+
+def write_binary_dump(filename, natoms=1000, nframes=10,
+                      columns=DUMP_COLUMNS, ntypes=2, length=10.0, nprocs=2,
+                      seed=0):
+    """Write a trajectory in the LAMMPS binary dump format.
+
+    The frames are written as by ``dump custom`` with ``binary yes``
+    (with the magic string, the units in the first frame and the
+    column names), and the atoms of each frame are split into one
+    chunk for each of ``nprocs`` processors. The other parameters are
+    as for :py:func:`.write_dump`.
+    """
+    rng = np.random.default_rng(seed)
+    magic = b'DUMPCUSTOM'
+    names = ' '.join(columns).encode('ascii')
+    with open(filename, 'wb') as output:
+        for step in range(nframes):
+            output.write(struct.pack('<q', -len(magic)) + magic)
+            output.write(struct.pack('<iiqqi', 1, 2, step * 100, natoms, 0))
+            output.write(struct.pack('<6i', *([0] * 6)))
+            output.write(struct.pack('<6d', *([0.0, length] * 3)))
+            output.write(struct.pack('<i', len(columns)))
+            units = b'real' if step == 0 else b''
+            output.write(struct.pack('<i', len(units)) + units + b'\x00')
+            output.write(struct.pack('<i', len(names)) + names)
+            output.write(struct.pack('<i', nprocs))
+            data = dump_atoms(rng, natoms, columns, ntypes, length)
+            for chunk in np.array_split(data, nprocs):
+                output.write(struct.pack('<i', chunk.size))
+                output.write(chunk.astype('<f8').tobytes())
+
+
+def write_log(filename, nsteps=1000, ncolumns=6, nruns=1, seed=0):
+    """Write a log file with thermo output.
+
+    Parameters
+    ----------
+    filename : string or pathlib.Path
+        The file to create.
+    nsteps : integer, optional
+        The number of thermo lines in each run.
+    ncolumns : integer, optional
+        The number of thermo columns, including the step.
+    nruns : integer, optional
+        The number of runs, each run gives one block of thermo output.
+    seed : integer, optional
+        Seed for the random numbers.
+    """
+    rng = np.random.default_rng(seed)
+    keys = list(THERMO_COLUMNS[:ncolumns])
+    keys += [f'c_extra[{i + 1}]' for i in range(ncolumns - len(keys))]
+    step = 0
+    with open(filename, 'w') as output:
+        output.write('LAMMPS (29 Oct 2020)\n')
+        output.write('units real\natom_style full\n')
+        for _ in range(nruns):
+            output.write(f'run {nsteps}\n')
+            output.write('Per MPI rank memory allocation (min/avg/max) = '
+                         '10.5 | 10.5 | 10.5 Mbytes\n')
+            output.write('{}\n'.format(' '.join(keys)))
+            data = rng.normal(size=(nsteps, len(keys)))
+            data[:, 0] = step + np.arange(nsteps)
+            np.savetxt(output, data,
+                       fmt=['%12d'] + ['%14.8g'] * (len(keys) - 1))
+            step += nsteps
+            output.write(f'Loop time of 1.234 on 1 procs for {nsteps} steps '
+                         'with 1000 atoms\n\n')
+        output.write('Total wall time: 0:00:01\n')
+
+
+def write_profile(filename, nchunks=100, nblocks=100, ncolumns=3,
+                  seed=0):
+    """Write profiles in the format of fix ave/chunk.
+
+    Parameters
+    ----------
+    filename : string or pathlib.Path
+        The file to create.
+    nchunks : integer, optional
+        The number of chunks (bins) in each profile.
+    nblocks : integer, optional
+        The number of profiles.
+    ncolumns : integer, optional
+        The number of values for each chunk.
+    seed : integer, optional
+        Seed for the random numbers.
+    """
+    rng = np.random.default_rng(seed)
+    keys = ['Chunk', 'Coord1', 'Ncount']
+    keys += [f'v_value{i + 1}' for i in range(ncolumns)]
+    chunk = np.arange(1, nchunks + 1)
+    coord = (chunk - 0.5) / nchunks
+    with open(filename, 'w') as output:
+        output.write('# Chunk-averaged data for fix profile and group all\n')
+        output.write('# Timestep Number-of-chunks Total-count\n')
+        output.write('# {}\n'.format(' '.join(keys)))
+        for block in range(nblocks):
+            count = rng.poisson(10, nchunks)
+            output.write(f'{(block + 1) * 1000} {nchunks} {count.sum()}\n')
+            data = np.column_stack(
+                [chunk, coord, count, rng.normal(size=(nchunks, ncolumns))]
+            )
+            np.savetxt(output, data,
+                       fmt=['%d', '%g', '%d'] + ['%g'] * ncolumns)
+
+
+def write_rdf(filename, nbins=100, nblocks=100, npairs=1, seed=0):
+    """Write RDFs in the format of fix ave/time for compute rdf.
+
+    Parameters
+    ----------
+    filename : string or pathlib.Path
+        The file to create.
+    nbins : integer, optional
+        The number of bins in each RDF.
+    nblocks : integer, optional
+        The number of RDFs.
+    npairs : integer, optional
+        The number of pairs of atom types.
+    seed : integer, optional
+        Seed for the random numbers.
+    """
+    rng = np.random.default_rng(seed)
+    keys = ['Row'] + [f'c_rdf[{i + 1}]' for i in range(2 * npairs + 1)]
+    row = np.arange(1, nbins + 1)
+    center = (row - 0.5) * 10.0 / nbins
+    with open(filename, 'w') as output:
+        output.write('# Time-averaged data for fix rdf\n')
+        output.write('# TimeStep Number-of-rows\n')
+        output.write('# {}\n'.format(' '.join(keys)))
+        for block in range(nblocks):
+            output.write(f'{(block + 1) * 1000} {nbins}\n')
+            values = rng.random((nbins, 2 * npairs))
+            values[:, 1::2] = np.cumsum(values[:, 1::2], axis=0)
+            np.savetxt(output, np.column_stack([row, center, values]),
+                       fmt=['%d'] + ['%g'] * (2 * npairs + 1))
+
+
+def write_data(filename, natoms=1000, atoms_per_molecule=3, ntypes=2,
+               length=10.0, seed=0):
+    """Write a data file with atom_style full.
+
+    The atoms are grouped into molecules where consecutive atoms are
+    bonded.
+
+    Parameters
+    ----------
+    filename : string or pathlib.Path
+        The file to create.
+    natoms : integer, optional
+        The number of atoms.
+    atoms_per_molecule : integer, optional
+        The number of atoms in each molecule.
+    ntypes : integer, optional
+        The number of atom types.
+    length : float, optional
+        The length of the (cubic) box.
+    seed : integer, optional
+        Seed for the random numbers.
+    """
+    rng = np.random.default_rng(seed)
+    idx = np.arange(1, natoms + 1)
+    mol = (idx - 1) // atoms_per_molecule + 1
+    bonded = np.flatnonzero(mol[1:] == mol[:-1])
+    bonds = np.column_stack(
+        [np.arange(1, len(bonded) + 1), np.ones(len(bonded)),
+         idx[bonded], idx[bonded + 1]]
+    )
+    atoms = np.column_stack([
+        idx, mol, rng.integers(1, ntypes + 1, natoms),
+        rng.normal(scale=0.5, size=natoms),
+        rng.random((natoms, 3)) * length,
+        np.zeros((natoms, 3)),
+    ])
+    masses = [1.008, 12.011, 14.007, 15.999, 32.06]
+    with open(filename, 'w') as output:
+        output.write('LAMMPS data file, synthetic\n\n')
+        output.write(f'{natoms} atoms\n{len(bonds)} bonds\n')
+        output.write(f'{ntypes} atom types\n1 bond types\n\n')
+        for i in ('x', 'y', 'z'):
+            output.write(f'0.0 {length} {i}lo {i}hi\n')
+        output.write('\nMasses\n\n')
+        for i in range(ntypes):
+            output.write(f'{i + 1} {masses[i % len(masses)]}\n')
+        output.write('\nAtoms # full\n\n')
+        np.savetxt(output, atoms,
+                   fmt=['%d', '%d', '%d', '%.4f', '%.6f', '%.6f', '%.6f',
+                        '%d', '%d', '%d'])
+        output.write('\nVelocities\n\n')
+        np.savetxt(output,
+                   np.column_stack([idx, rng.normal(size=(natoms, 3))]),
+                   fmt=['%d', '%.6f', '%.6f', '%.6f'])
+        output.write('\nBonds\n\n')
+        np.savetxt(output, bonds, fmt='%d')
+
+
+def write_all(outdir, natoms=1000, nframes=10, columns=DUMP_COLUMNS,
+              nsteps=1000, seed=0):
+    """Write one file of each kind to a directory.
+
+    Returns
+    -------
+    out : dict of pathlib.Path
+        The files created.
+    """
+    outdir = pathlib.Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    files = {
+        'dump': outdir / 'dump.lammpstrj',
+        'binary': outdir / 'dump.bin',
+        'log': outdir / 'log.lammps',
+        'profile': outdir / 'profile.txt',
+        'rdf': outdir / 'rdf.txt',
+        'data': outdir / 'system.data',
+    }
+    write_dump(files['dump'], natoms=natoms, nframes=nframes,
+               columns=columns, seed=seed)
+    write_binary_dump(files['binary'], natoms=natoms, nframes=nframes,
+                      columns=columns, seed=seed)
+    write_log(files['log'], nsteps=nsteps, seed=seed)
+    write_profile(files['profile'], nblocks=nframes, seed=seed)
+    write_rdf(files['rdf'], nblocks=nframes, seed=seed)
+    write_data(files['data'], natoms=natoms, seed=seed)
+    return files
+
+
+def create_parser():
+    """Create a parser."""
+    parser = argparse.ArgumentParser(
+        description='Create synthetic LAMMPS files'
+    )
+    parser.add_argument('outdir', help='Directory to write the files to')
+    parser.add_argument(
+        '-a',
+        '--atoms',
+        help='Number of atoms',
+        type=int,
+        default=1000,
+    )
+    parser.add_argument(
+        '-f',
+        '--frames',
+        help='Number of frames (and profiles and RDFs)',
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        '-c',
+        '--columns',
+        help='Atom columns in the trajectory',
+        default=','.join(DUMP_COLUMNS),
+    )
+    parser.add_argument(
+        '-s',
+        '--steps',
+        help='Number of thermo lines in the log file',
+        type=int,
+        default=1000,
+    )
+    return parser
+
+
+if __name__ == '__main__':
+    ARGS = create_parser().parse_args()
+    for FILENAME in write_all(ARGS.outdir, natoms=ARGS.atoms,
+                              nframes=ARGS.frames,
+                              columns=ARGS.columns.split(','),
+                              nsteps=ARGS.steps).values():
+        print('Wrote file "{}"'.format(FILENAME))
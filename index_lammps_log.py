@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+"""Index the runs in a LAMMPS log file and read their thermo output lazily.
+
+The index stores the keys, the byte range and the number of rows of
+every block of thermo output (one for each run) and is saved next to
+the log in a sidecar file (``<log>.idx.npz``), see
+``index_lammpstrj.py``. Columns are only parsed when they are asked
+for, and only for the run they belong to.
+"""
+from collections.abc import Mapping
+import mmap
+import os
+import pathlib
+import re
+import sys
+import numpy as np
+from index_lammpstrj import index_path, load_frame_index
+from read_lammps_log import find_thermo_blocks, parse_thermo_block
+
+
+# Lines of thermo output start with a number:
+THERMO_ROW = re.compile(rb'^[ \t]*[-+.0-9]', re.MULTILINE)
+
+
+def build_log_index(logfile):
+    """Create the index for the thermo output in a log file.
+
+    Returns
+    -------
+    index : dict of numpy.arrays
+        The keys for each run (joined by spaces), the start and end
+        of the thermo output for each run (``begin`` and ``end``), the
+        number of rows, and the ``size`` and ``mtime`` of the log file.
+    """
+    keys, begin, end, rows = [], [], [], []
+    with open(logfile, 'rb') as infile:
+        stat = os.fstat(infile.fileno())
+        if stat.st_size > 0:
+            with mmap.mmap(infile.fileno(), 0,
+                           access=mmap.ACCESS_READ) as mem:
+                for start, first, last in find_thermo_blocks(mem):
+                    keys.append(mem[start:first].decode().lower().strip())
+                    begin.append(first)
+                    end.append(last)
+                    rows.append(len(THERMO_ROW.findall(mem, first, last)))
+    return {
+        'keys': np.array(keys, dtype=str),
+        'begin': np.array(begin, dtype=np.int64),
+        'end': np.array(end, dtype=np.int64),
+        'rows': np.array(rows, dtype=np.int64),
+        'size': np.int64(stat.st_size),
+        'mtime': np.int64(stat.st_mtime_ns),
+    }
+
+
+class ThermoRun(Mapping):
+    """The thermo output from one run, with the columns read on demand.
+
+    The run can be used as a dictionary with an array for each key,
+    for instance ``run['temp']``. Columns are parsed the first time
+    they are asked for and then kept.
+
+    Attributes
+    ----------
+    keys : list of strings
+        The thermo keywords (lower case).
+    begin, end : integer
+        The byte range of the thermo output in the log file.
+    rows : integer
+        The number of lines of thermo output, counted as the lines
+        starting with a number. Lines which are cut short are counted
+        here, but left out when the columns are parsed.
+    """
+
+    def __init__(self, logfile, keys, begin, end, rows):
+        """Store where the run is found."""
+        self.logfile = logfile
+        self.keys = keys
+        self.begin = begin
+        self.end = end
+        self.rows = rows
+        self._columns = {}
+
+    def load(self, keys=None):
+        """Parse some columns (the default is all) in one go.
+
+        Returns
+        -------
+        out : dict of numpy.arrays
+            The requested columns.
+        """
+        keys = self.keys if keys is None else list(keys)
+        for key in keys:
+            if key not in self.keys:
+                raise KeyError(key)
+        missing = [key for key in keys if key not in self._columns]
+        if missing:
+            with open(self.logfile, 'rb') as infile:
+                infile.seek(self.begin)
+                block = infile.read(self.end - self.begin)
+            data = parse_thermo_block(
+                block, len(self.keys),
+                usecols=[self.keys.index(key) for key in missing],
+            )
+            for i, key in enumerate(missing):
+                self._columns[key] = data[:, i]
+        return {key: self._columns[key] for key in keys}
+
+    def __getitem__(self, key):
+        """Return the column for a key."""
+        return self.load([key])[key]
+
+    def __iter__(self):
+        """Iterate over the keys."""
+        return iter(self.keys)
+
+    def __len__(self):
+        """Return the number of keys."""
+        return len(self.keys)
+
+    def __repr__(self):
+        """Show the size and the keys."""
+        return f'ThermoRun(rows={self.rows}, keys={self.keys})'
+
+
+class ThermoLog:
+    """The runs in a LAMMPS log file, indexed for lazy reading.
+
+    Examples
+    --------
+    >>> log = ThermoLog('log.lammps')
+    >>> temp = log.runs[-1]['temp']
+
+    Attributes
+    ----------
+    runs : list of objects like ThermoRun
+        The runs, in the order they are found in the log file.
+    """
+
+    def __init__(self, logfile, rebuild=False):
+        """Load (or create) the index for a log file."""
+        self.filename = pathlib.Path(logfile)
+        self.index = load_frame_index(self.filename, rebuild=rebuild,
+                                      build=build_log_index)
+        self.runs = [
+            ThermoRun(self.filename, str(keys).split(), int(begin), int(end),
+                      int(rows))
+            for keys, begin, end, rows in zip(
+                self.index['keys'], self.index['begin'], self.index['end'],
+                self.index['rows'],
+            )
+        ]
+
+    def __len__(self):
+        """Return the number of runs."""
+        return len(self.runs)
+
+    def __getitem__(self, i):
+        """Return run number i."""
+        return self.runs[i]
+
+    def __iter__(self):
+        """Iterate over the runs."""
+        return iter(self.runs)
+
+    def column(self, key):
+        """Join a column from all the runs which have it."""
+        return np.concatenate(
+            [run[key] for run in self.runs if key in run.keys] +
+            [np.zeros(0)]
+        )
+
+
+def main(logfile):
+    """Create the index for a log file and print a summary."""
+    log = ThermoLog(logfile, rebuild=True)
+    print(f'Index: {index_path(logfile)}')
+    print(f'Runs: {len(log)}')
+    for i, run in enumerate(log):
+        print(f'{i}: {run.rows} rows, keys: {" ".join(run.keys)}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
@@ -0,0 +1,493 @@
+#!/usr/bin/env python
+"""Index the frames in a lammpstrj file for random access.
+
+The index stores the byte offset, timestep and number of atoms for
+every frame and it is saved next to the trajectory in a sidecar file
+(``<trajectory>.idx.npz``) so that it only has to be created once.
+
+For compressed trajectories, the offsets refer to the decompressed
+data and the index also stores checkpoints: the places in the
+compressed file where a new compressed stream (a gzip member, or a
+bz2 or xz stream) starts. Decompression can be started at any
+checkpoint, so a frame is read by decompressing from the closest
+checkpoint before it, and frames read in order are decompressed in one
+pass (see :py:class:`.CompressedFile`). Files with many checkpoints can
+be created with :py:func:`.compress_trajectory`.
+"""
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import pathlib
+import sys
+import zlib
+import numpy as np
+from read_lammpstrj import (
+    CHUNK_SIZE,
+    compression_format,
+    frame_to_dict,
+    iter_stream_frames,
+    read_frame,
+    read_lammpstrj,
+)
+
+
+INDEX_SUFFIX = '.idx.npz'
+
+
+def index_path(lmp):
+    """Return the path to the sidecar index for a lammpstrj file."""
+    lmp = pathlib.Path(lmp)
+    return lmp.with_name(f'{lmp.name}{INDEX_SUFFIX}')
+
+
+def _read_int_line(mem, pos):
+    """Read the integer on the line after the one starting at pos."""
+    start = mem.find(b'\n', pos)
+    if start == -1:
+        return None, -1
+    start += 1
+    end = mem.find(b'\n', start)
+    if end == -1:
+        return None, -1
+    try:
+        return int(mem[start:end]), end
+    except ValueError:
+        return None, -1
+
+
+def count_lines(mem, start, end, chunk_size=CHUNK_SIZE):
+    """Count the newline terminated lines in mem[start:end]."""
+    count = 0
+    for pos in range(start, end, chunk_size):
+        part = np.frombuffer(mem, dtype=np.uint8,
+                             count=min(chunk_size, end - pos), offset=pos)
+        count += int(np.count_nonzero(part == ord('\n')))
+    return count
+
+
+def scan_frames(mem, start=0):
+    """Locate complete frames in a memory map, starting at start.
+
+    A frame is complete when its ``ITEM: ATOMS`` line is followed by
+    as many lines as it has atoms.
+
+    Returns
+    -------
+    out : tuple
+        The byte offsets, the timesteps and the number of atoms for
+        the frames found, and the byte offset where the scan stopped.
+        A frame with a header we cannot read or with missing atom
+        lines (for instance, a truncated last frame) ends the scan,
+        and the scan stops at the start of that frame.
+    """
+    offsets, timesteps, natoms = [], [], []
+    pos = mem.find(b'ITEM: TIMESTEP', start)
+    while pos != -1:
+        step, end = _read_int_line(mem, pos)
+        if step is None:
+            return offsets, timesteps, natoms, pos
+        pos_n = mem.find(b'ITEM: NUMBER OF ATOMS', end)
+        if pos_n == -1:
+            return offsets, timesteps, natoms, pos
+        number, end = _read_int_line(mem, pos_n)
+        if number is None:
+            return offsets, timesteps, natoms, pos
+        next_pos = mem.find(b'ITEM: TIMESTEP', end)
+        frame_end = len(mem) if next_pos == -1 else next_pos
+        atoms = mem.find(b'ITEM: ATOMS', end, frame_end)
+        atoms = -1 if atoms == -1 else mem.find(b'\n', atoms, frame_end)
+        if atoms == -1 or count_lines(mem, atoms + 1, frame_end) < number:
+            return offsets, timesteps, natoms, pos
+        offsets.append(pos)
+        timesteps.append(step)
+        natoms.append(number)
+        pos = next_pos
+    return offsets, timesteps, natoms, len(mem)
+
+
+def new_decompressor(fmt):
+    """Create a decompressor for a single compressed stream."""
+    if fmt == 'gzip':
+        return zlib.decompressobj(wbits=31)
+    if fmt == 'bz2':
+        return bz2.BZ2Decompressor()
+    return lzma.LZMADecompressor()
+
+
+class CheckpointReader:
+    """Decompress a file, recording where new compressed streams start.
+
+    Attributes
+    ----------
+    checkpoints : list of tuples
+        The offset in the compressed file and the corresponding
+        offset in the decompressed data for the start of each
+        compressed stream.
+    """
+
+    def __init__(self, infile, fmt, raw_offset=0, offset=0,
+                 chunk_size=CHUNK_SIZE):
+        """Start decompressing a stream at the given offsets.
+
+        Parameters
+        ----------
+        infile : file object
+            The compressed file, opened in binary mode.
+        fmt : string
+            The compression format, see
+            :py:data:`read_lammpstrj.COMPRESSION`.
+        raw_offset : integer, optional
+            Where a compressed stream starts in the file.
+        offset : integer, optional
+            The offset in the decompressed data for raw_offset.
+        chunk_size : integer, optional
+            The number of compressed bytes to read at a time.
+        """
+        self.infile = infile
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.infile.seek(raw_offset)
+        self.raw_offset = raw_offset  # Compressed bytes read so far.
+        self.offset = offset  # Decompressed bytes given so far.
+        self.checkpoints = [(raw_offset, offset)]
+        self._decompressor = new_decompressor(fmt)
+
+    def _next_stream(self):
+        """Start on the next compressed stream, return its first bytes."""
+        data = self._decompressor.unused_data.lstrip(b'\0')
+        while not data:
+            data = self.infile.read(self.chunk_size)
+            self.raw_offset += len(data)
+            if not data:
+                return None
+            data = data.lstrip(b'\0')
+        self.checkpoints.append((self.raw_offset - len(data), self.offset))
+        self._decompressor = new_decompressor(self.fmt)
+        return data
+
+    def read(self, size=-1):
+        """Return the next decompressed bytes, empty bytes at the end.
+
+        The size is ignored, all bytes decompressed from the next
+        compressed chunk are given.
+        """
+        while True:
+            if self._decompressor.eof:
+                data = self._next_stream()
+            else:
+                data = self.infile.read(self.chunk_size)
+                self.raw_offset += len(data)
+            if not data:
+                return b''
+            out = self._decompressor.decompress(data)
+            if out:
+                self.offset += len(out)
+                return out
+
+
+def build_compressed_index(lmp):
+    """Create the frame index and checkpoints for a compressed file."""
+    offsets, timesteps, natoms = [], [], []
+    stop = 0
+    with open(lmp, 'rb') as infile:
+        stat = os.fstat(infile.fileno())
+        reader = CheckpointReader(infile, compression_format(lmp))
+        for offset, frame in iter_stream_frames(reader):
+            found, step, number, _ = scan_frames(frame)
+            if not found or found[0] != 0:
+                stop = offset
+                break
+            offsets.append(offset)
+            timesteps.append(step[0])
+            natoms.append(number[0])
+            stop = offset + len(frame)
+    checkpoints = np.array(reader.checkpoints, dtype=np.int64)
+    return {
+        'offset': np.array(offsets + [stop], dtype=np.int64),
+        'timestep': np.array(timesteps, dtype=np.int64),
+        'natoms': np.array(natoms, dtype=np.int64),
+        'size': np.int64(stat.st_size),
+        'mtime': np.int64(stat.st_mtime_ns),
+        'checkpoint_raw': checkpoints[:, 0],
+        'checkpoint_offset': checkpoints[:, 1],
+    }
+
+
+class CompressedFile:
+    """Read ranges of decompressed bytes from a compressed trajectory.
+
+    Decompression is started at the closest checkpoint before the
+    first range and then continues forward: a range starting after
+    the previous one is read by decompressing on from where the
+    previous range ended. Reading the frames in order therefore
+    decompresses the file once. Decompression only restarts (at a
+    checkpoint) for a range before the current position, or when a
+    checkpoint closer to the range can be used.
+    """
+
+    def __init__(self, lmp, index):
+        """Open the file, the index must have the checkpoints."""
+        self.filename = lmp
+        self.checkpoint_raw = index['checkpoint_raw']
+        self.checkpoint_offset = index['checkpoint_offset']
+        self._infile = open(lmp, 'rb')
+        self._reader = None
+        self._buffer = bytearray()  # decompressed, but not yet used
+        self._start = 0  # offset of the buffer in the decompressed data
+
+    def __enter__(self):
+        """Allow use as a context manager."""
+        return self
+
+    def __exit__(self, *args):
+        """Close the file when leaving the context."""
+        self.close()
+
+    def close(self):
+        """Close the file."""
+        self._infile.close()
+
+    def _restart(self, start):
+        """Start decompressing at the closest checkpoint before start."""
+        k = np.searchsorted(self.checkpoint_offset, start, side='right') - 1
+        self._reader = CheckpointReader(
+            self._infile,
+            compression_format(self.filename),
+            raw_offset=int(self.checkpoint_raw[k]),
+            offset=int(self.checkpoint_offset[k]),
+        )
+        self._buffer = bytearray()
+        self._start = self._reader.offset
+
+    def read(self, start, end):
+        """Return the decompressed bytes start:end."""
+        if self._reader is None or start < self._start:
+            self._restart(start)
+        else:
+            k = np.searchsorted(self.checkpoint_offset, start,
+                                side='right') - 1
+            if self.checkpoint_offset[k] > self._reader.offset:
+                self._restart(start)
+        while self._start + len(self._buffer) < end:
+            chunk = self._reader.read()
+            if not chunk:
+                break
+            if self._start + len(self._buffer) + len(chunk) <= start:
+                # Nothing we need, skip it:
+                self._start += len(self._buffer) + len(chunk)
+                self._buffer = bytearray()
+                continue
+            self._buffer += chunk
+        # Drop what we are done with:
+        drop = max(min(start - self._start, len(self._buffer)), 0)
+        del self._buffer[:drop]
+        self._start += drop
+        data = bytes(self._buffer[:end - self._start])
+        del self._buffer[:len(data)]
+        self._start += len(data)
+        return data
+
+
+def read_compressed_range(lmp, index, start, end):
+    """Read the decompressed bytes start:end, using the checkpoints.
+
+    Use :py:class:`.CompressedFile` for reading several ranges.
+    """
+    with CompressedFile(lmp, index) as infile:
+        return infile.read(start, end)
+
+
+def compress_trajectory(lmp, outfile, frames_per_stream=100,
+                        compresslevel=6):
+    """Write a gzip compressed copy of a trajectory with checkpoints.
+
+    A new gzip member is started for every frames_per_stream frames,
+    so that the frames can be accessed without decompressing the
+    whole file. The result is a regular gzip file.
+    """
+    with open(outfile, 'wb') as output:
+        frames = []
+        for frame in read_lammpstrj(lmp):
+            frames.append(''.join(frame).encode('utf-8'))
+            if len(frames) >= frames_per_stream:
+                output.write(gzip.compress(b''.join(frames), compresslevel))
+                frames = []
+        if frames:
+            output.write(gzip.compress(b''.join(frames), compresslevel))
+
+
+def build_frame_index(lmp):
+    """Create the frame index for a lammpstrj file.
+
+    Returns
+    -------
+    index : dict of numpy.arrays
+        ``offset`` has one more entry than the number of frames so
+        that frame ``i`` is found in the bytes
+        ``offset[i]:offset[i + 1]``. ``size`` and ``mtime`` describe
+        the trajectory file the index was created for. Compressed
+        files also have the checkpoints, see
+        :py:func:`.build_compressed_index`.
+    """
+    if compression_format(lmp) is not None:
+        return build_compressed_index(lmp)
+    with open(lmp, 'rb') as infile:
+        stat = os.fstat(infile.fileno())
+        offsets, timesteps, natoms, stop = [], [], [], 0
+        if stat.st_size > 0:
+            with mmap.mmap(infile.fileno(), 0,
+                           access=mmap.ACCESS_READ) as mem:
+                offsets, timesteps, natoms, stop = scan_frames(mem)
+    return {
+        'offset': np.array(offsets + [stop], dtype=np.int64),
+        'timestep': np.array(timesteps, dtype=np.int64),
+        'natoms': np.array(natoms, dtype=np.int64),
+        'size': np.int64(stat.st_size),
+        'mtime': np.int64(stat.st_mtime_ns),
+    }
+
+
+def write_frame_index(lmp, index):
+    """Store the frame index in the sidecar file."""
+    with open(index_path(lmp), 'wb') as output:
+        np.savez(output, **index)
+
+
+def read_frame_index(lmp):
+    """Read the sidecar index, return None if it is missing or stale."""
+    sidecar = index_path(lmp)
+    if not sidecar.is_file():
+        return None
+    stat = os.stat(lmp)
+    with np.load(sidecar) as npz:
+        index = {key: npz[key] for key in npz.files}
+    if (index['size'] != stat.st_size or
+            index['mtime'] != stat.st_mtime_ns):
+        return None
+    return index
+
+
+def load_frame_index(lmp, rebuild=False, build=build_frame_index):
+    """Load the index for a lammpstrj file, creating it if needed.
+
+    The index is created by calling ``build(lmp)``, which must give
+    the same items as :py:func:`.build_frame_index`.
+    """
+    index = None if rebuild else read_frame_index(lmp)
+    if index is None:
+        index = build(lmp)
+        try:
+            write_frame_index(lmp, index)
+        except OSError as error:
+            print(f'Could not store index for "{lmp}": {error}')
+    return index
+
+
+class IndexedTrajectory:
+    """Random access to the frames of a lammpstrj file.
+
+    Frames are given as dictionaries (see
+    :py:func:`read_lammpstrj.frame_to_dict`), or as the more compact
+    :py:class:`read_lammpstrj.Frame` objects if ``as_frame`` is True,
+    and can be obtained by their position (``traj[i]``) or by their
+    timestep (``traj.at_timestep(t)``). The columns to convert and the
+    atoms to select can be given as for
+    :py:func:`read_lammpstrj.frame_to_dict`.
+    """
+
+    def __init__(self, lmp, rebuild=False, columns=None, select=None,
+                 as_frame=False):
+        """Set up the trajectory and load (or create) the index."""
+        self.filename = pathlib.Path(lmp)
+        self.index = load_frame_index(self.filename, rebuild=rebuild)
+        self.columns = columns
+        self.select = select
+        self.as_frame = as_frame
+        self._handle = None
+
+    def __len__(self):
+        """Return the number of frames."""
+        return len(self.timesteps)
+
+    def __getitem__(self, i):
+        """Return frame number i."""
+        convert = read_frame if self.as_frame else frame_to_dict
+        return convert(self.raw_frame(i), columns=self.columns,
+                       select=self.select)
+
+    def __iter__(self):
+        """Iterate over all frames."""
+        for i in range(len(self)):
+            yield self[i]
+
+    def __enter__(self):
+        """Allow use as a context manager."""
+        return self
+
+    def __exit__(self, *args):
+        """Close the trajectory file when leaving the context."""
+        self.close()
+
+    def close(self):
+        """Close the trajectory file."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    @property
+    def timesteps(self):
+        """Return the timesteps of all frames."""
+        return self.index['timestep']
+
+    def _position(self, i):
+        """Check and wrap a frame number."""
+        length = len(self)
+        if not -length <= i < length:
+            raise IndexError(f'Frame {i} is out of range ({length} frames)')
+        return i % length
+
+    def raw_bytes(self, i):
+        """Return the bytes for frame number i."""
+        i = self._position(i)
+        start = int(self.index['offset'][i])
+        end = int(self.index['offset'][i + 1])
+        if 'checkpoint_raw' in self.index:
+            if self._handle is None:
+                self._handle = CompressedFile(self.filename, self.index)
+            return self._handle.read(start, end)
+        if self._handle is None:
+            self._handle = open(self.filename, 'rb')
+        self._handle.seek(start)
+        return self._handle.read(end - start)
+
+    def raw_frame(self, i):
+        """Return frame number i as lines, like read_lammpstrj does."""
+        return self.raw_bytes(i).decode('utf-8').splitlines(keepends=True)
+
+    def frame_number(self, timestep):
+        """Find the frame number for a timestep by a binary search."""
+        timesteps = self.timesteps
+        i = np.searchsorted(timesteps, timestep)
+        if i >= len(timesteps) or timesteps[i] != timestep:
+            raise KeyError(f'Timestep {timestep} not found')
+        return int(i)
+
+    def at_timestep(self, timestep):
+        """Return the frame for the given timestep."""
+        return self[self.frame_number(timestep)]
+
+
+def main(infile):
+    """Create the index for a lammpstrj file and print a summary."""
+    index = load_frame_index(infile, rebuild=True)
+    print(f'Index: {index_path(infile)}')
+    print(f'Frames: {len(index["timestep"])}')
+    if len(index['timestep']) > 0:
+        print(f'First timestep: {index["timestep"][0]}')
+        print(f'Last timestep: {index["timestep"][-1]}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
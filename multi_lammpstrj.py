@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""Read a trajectory which is split over several lammpstrj files.
+
+When a simulation is restarted, the new dump file usually starts with
+frames that are also found at the end of the previous file. Here, the
+files are ordered by their first timestep and a frame is taken from
+the last file that contains it: the frames of a file are only used up
+to the first timestep of the next file. This is decided from the frame
+index of each file (see ``index_lammpstrj.py``), so the duplicated
+frames are never read.
+"""
+import glob
+import itertools
+import pathlib
+import sys
+import numpy as np
+from index_lammpstrj import IndexedTrajectory
+from read_lammpstrj import iter_frame_buffers
+
+
+def find_segments(pattern):
+    """Find the files matching a pattern like "dump.*.lammpstrj"."""
+    if pathlib.Path(pattern).exists():
+        return [pattern]
+    return sorted(glob.glob(pattern))
+
+
+def open_trajectory_files(pattern):
+    """Open a trajectory given as a file name or a pattern.
+
+    Returns
+    -------
+    out : string or object like MultiTrajectory
+        The file name if the pattern matches a single file, otherwise
+        the matching files as a :py:class:`.MultiTrajectory`.
+    """
+    files = find_segments(pattern)
+    if not files:
+        raise FileNotFoundError(f'No files found for "{pattern}"')
+    if len(files) == 1:
+        return files[0]
+    return MultiTrajectory(files)
+
+
+class MultiTrajectory(IndexedTrajectory):
+    """Random access to the frames of a trajectory split over files.
+
+    This works as :py:class:`index_lammpstrj.IndexedTrajectory`, and
+    the frames of all files are numbered as if they were in one file,
+    with duplicated timesteps removed.
+
+    Attributes
+    ----------
+    segments : list of objects like IndexedTrajectory
+        The files, ordered by their first timestep. Empty files are
+        left out.
+    lengths : list of integers
+        The number of frames used from each file.
+    duplicates : integer
+        The number of frames which are left out since they are found
+        again in a later file.
+    """
+
+    def __init__(self, files, rebuild=False, columns=None, select=None,
+                 as_frame=False):
+        """Set up the trajectory and load (or create) the indexes."""
+        segments = [IndexedTrajectory(i, rebuild=rebuild) for i in files]
+        segments = [i for i in segments if len(i) > 0]
+        segments.sort(key=lambda segment: segment.timesteps[0])
+        self.filename = None
+        self.segments = segments
+        self.columns = columns
+        self.select = select
+        self.as_frame = as_frame
+        self.lengths = []
+        for i, segment in enumerate(segments):
+            if i + 1 < len(segments):
+                first = segments[i + 1].timesteps[0]
+                self.lengths.append(
+                    int(np.searchsorted(segment.timesteps, first))
+                )
+            else:
+                self.lengths.append(len(segment))
+        self.duplicates = sum(len(i) for i in segments) - sum(self.lengths)
+        self._segment = np.repeat(np.arange(len(segments)), self.lengths)
+        self._local = np.concatenate(
+            [np.arange(i) for i in self.lengths] + [np.zeros(0, dtype=int)]
+        )
+        self._timesteps = np.concatenate(
+            [i.timesteps[:n] for i, n in zip(segments, self.lengths)] +
+            [np.zeros(0, dtype=np.int64)]
+        )
+
+    def close(self):
+        """Close all the trajectory files."""
+        for segment in self.segments:
+            segment.close()
+
+    @property
+    def timesteps(self):
+        """Return the timesteps of all frames."""
+        return self._timesteps
+
+    def locate(self, i):
+        """Return the segment number and the frame number in it."""
+        i = self._position(i)
+        return int(self._segment[i]), int(self._local[i])
+
+    def raw_bytes(self, i):
+        """Return the bytes for frame number i."""
+        segment, local = self.locate(i)
+        return self.segments[segment].raw_bytes(local)
+
+    def byte_ranges(self, frames):
+        """Get the byte ranges for some frames in their files.
+
+        Consecutive frames in the same file are merged into one range.
+
+        Yields
+        ------
+        out : tuple of integers
+            The segment number and the start and end of the range.
+        """
+        current = None
+        for i in frames:
+            segment, local = self.locate(i)
+            offset = self.segments[segment].index['offset']
+            begin, end = int(offset[local]), int(offset[local + 1])
+            if (current is not None and current[0] == segment and
+                    current[2] == begin):
+                current[2] = end
+                continue
+            if current is not None:
+                yield tuple(current)
+            current = [segment, begin, end]
+        if current is not None:
+            yield tuple(current)
+
+    def iter_frame_buffers(self):
+        """Iterate over all frames, as byte ranges.
+
+        This works as :py:func:`read_lammpstrj.iter_frame_buffers`, so
+        that the files can be read in one pass.
+        """
+        for segment, length in zip(self.segments, self.lengths):
+            frames = iter_frame_buffers(segment.filename)
+            yield from itertools.islice(frames, length)
+            frames.close()
+
+
+def main(pattern):
+    """Index the files of a trajectory and print a summary."""
+    files = find_segments(pattern)
+    with MultiTrajectory(files) as traj:
+        for segment, length in zip(traj.segments, traj.lengths):
+            print(f'{segment.filename}: using {length} of {len(segment)} '
+                  f'frames, timesteps {segment.timesteps[0]}-'
+                  f'{segment.timesteps[-1]}')
+        print(f'Frames: {len(traj)}')
+        print(f'Duplicated frames left out: {traj.duplicates}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
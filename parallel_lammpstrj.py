@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""Parse the frames of a lammpstrj file in parallel."""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sys
+import numpy as np
+from index_lammpstrj import load_frame_index, read_compressed_range
+from read_lammpstrj import frame_to_dict, read_frame, read_lammpstrj_slice
+
+
+def parse_frames(lmp, offsets, columns=None, select=None,
+                 checkpoints=None, as_frame=False):
+    """Read and convert the frames found between the given offsets.
+
+    This is the task executed by the worker processes. Frame ``i`` is
+    stored in the bytes ``offsets[i]:offsets[i + 1]``. For compressed
+    files, the checkpoints from the frame index must be given.
+    """
+    convert = read_frame if as_frame else frame_to_dict
+    if checkpoints is not None:
+        raw = read_compressed_range(lmp, checkpoints, offsets[0],
+                                    offsets[-1])
+    else:
+        with open(lmp, 'rb') as infile:
+            infile.seek(offsets[0])
+            raw = infile.read(offsets[-1] - offsets[0])
+    frames = []
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        lines = raw[start - offsets[0]:end - offsets[0]].decode('utf-8')
+        frames.append(
+            convert(lines.splitlines(keepends=True), columns=columns,
+                    select=select)
+        )
+    return frames
+
+
+def task_ranges(offsets, frames_per_task, checkpoints=None):
+    """Split the frames into the ranges parsed by the tasks.
+
+    For compressed files, the ranges start at the frames where a new
+    compressed stream starts, and a range covers whole streams, so
+    that each stream is only decompressed by one task.
+
+    Returns
+    -------
+    out : list of tuples
+        The first frame and the frame after the last for each task.
+    """
+    nframes = len(offsets) - 1
+    if checkpoints is None:
+        starts = range(0, nframes, frames_per_task)
+    else:
+        starts = np.searchsorted(offsets[:-1],
+                                 checkpoints['checkpoint_offset'])
+    bounds = [0]
+    for start in starts:
+        if start - bounds[-1] >= frames_per_task and start < nframes:
+            bounds.append(int(start))
+    bounds.append(nframes)
+    return [
+        (start, end) for start, end in zip(bounds[:-1], bounds[1:])
+        if end > start
+    ]
+
+
+def read_lammpstrj_parallel(lmp, workers=None, lookahead=None,
+                            frames_per_task=1, columns=None, select=None,
+                            as_frame=False):
+    """Iterate over converted frames, parsing them in worker processes.
+
+    The frames are given in the same order, and in the same form, as
+    :py:func:`read_lammpstrj.frame_to_dict` gives them, or as
+    :py:class:`read_lammpstrj.Frame` objects (which are cheaper to
+    send from the workers) if ``as_frame`` is True. Compressed files
+    are supported, but the workers can only decompress in parallel if
+    the file has several checkpoints (see
+    :py:func:`index_lammpstrj.compress_trajectory`). Each task then
+    parses the frames of one or more whole compressed streams. Files
+    with a single checkpoint (most gzip, bz2 and xz files) are read
+    serially, in one pass, since each worker would otherwise have to
+    decompress the file from the start.
+
+    Parameters
+    ----------
+    lmp : string or pathlib.Path
+        The trajectory to read.
+    workers : integer, optional
+        The number of worker processes. The default is the number of
+        CPUs.
+    lookahead : integer, optional
+        The maximum number of tasks submitted, but not yet given
+        back. This limits the number of parsed frames kept in memory
+        to ``lookahead * frames_per_task``. The default is two tasks
+        per worker.
+    frames_per_task : integer, optional
+        The number of consecutive frames parsed in each task. For
+        compressed files, this is the least number of frames.
+    columns : list of strings, optional
+        The atom columns to convert, the default is all columns.
+    select : dict, optional
+        Criteria for selecting atoms, see
+        :py:func:`read_lammpstrj.select_atoms`. The criteria are sent
+        to the workers and must therefore be picklable.
+    as_frame : boolean, optional
+        If True, the frames are given as Frame objects.
+
+    Yields
+    ------
+    out : dict or object like read_lammpstrj.Frame
+        The converted frames.
+    """
+    if workers is None:
+        workers = os.cpu_count()
+    if lookahead is None:
+        lookahead = 2 * workers
+    index = load_frame_index(lmp)
+    offsets = [int(i) for i in index['offset']]
+    checkpoints = None
+    if 'checkpoint_raw' in index:
+        checkpoints = {
+            key: index[key] for key in ('checkpoint_raw', 'checkpoint_offset')
+        }
+    convert = read_frame if as_frame else frame_to_dict
+    if checkpoints is not None and len(checkpoints['checkpoint_raw']) < 2:
+        print(f'"{lmp}" is compressed as a single stream, the frames are '
+              'read without worker processes')
+        for frame in read_lammpstrj_slice(lmp, stop=len(offsets) - 1):
+            yield convert(frame, columns=columns, select=select)
+        return
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start, end in task_ranges(offsets, frames_per_task,
+                                      checkpoints=checkpoints):
+            pending.append(
+                pool.submit(parse_frames, lmp, offsets[start:end + 1],
+                            columns=columns, select=select,
+                            checkpoints=checkpoints, as_frame=as_frame)
+            )
+            if len(pending) >= lookahead:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(infile, workers=None):
+    """Print the frames in a lammpstrj file, parsing them in parallel."""
+    for i, data in enumerate(read_lammpstrj_parallel(infile,
+                                                     workers=workers)):
+        print(i, data['timestep'], data['number of atoms'])
+
+
+if __name__ == '__main__':
+    try:
+        main(sys.argv[1], workers=int(sys.argv[2]))
+    except IndexError:
+        main(sys.argv[1])
@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+"""Create profiles from a lammpstrj file, like fix ave/chunk does.
+
+The atoms are binned along one or more axes (in reduced coordinates,
+so all bins have the same volume) and the number density, mass
+density, temperature or the average of any per-atom column in the
+dump is calculated for each bin. The frames are processed in blocks
+and each block gives one profile, written in the same format as
+``fix ave/chunk`` so that it can be averaged with
+``average_lammps_profile.py``.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import pathlib
+import numpy as np
+from array_lammpstrj import (
+    VELOCITIES,
+    atom_columns,
+    box_matrices,
+    box_parameters,
+    coordinate_columns,
+)
+from index_lammpstrj import IndexedTrajectory
+from read_lammpstrj import frame_to_dict
+
+
+# Boltzmann constant, the conversion of m*v**2 to energy and the
+# conversion of mass/volume to density (mv2d) for the LAMMPS unit
+# styles:
+UNITS = {
+    'lj': (1.0, 1.0, 1.0),
+    'real': (0.0019872067, 48.88821291 * 48.88821291, 1.0 / 0.602214129),
+    'metal': (8.617343e-5, 1.0364269e-4, 1.0 / 0.602214129),
+    'si': (1.3806504e-23, 1.0, 1.0),
+    'cgs': (1.3806504e-16, 1.0, 1.0),
+    'electron': (3.16681534e-6, 1.06657236, 1.0),
+    'micro': (1.3806504e-8, 1.0, 1.0),
+    'nano': (0.013806504, 1.0, 1.0),
+}
+AXES = {'x': 0, 'y': 1, 'z': 2}
+DENSITY_NUMBER = 'density/number'
+DENSITY_MASS = 'density/mass'
+TEMPERATURE = 'temp'
+
+
+def atom_masses(atoms, masses):
+    """Get the mass of each atom, from the dump or from the types."""
+    if 'mass' in atoms:
+        return atoms['mass']
+    if masses is None:
+        raise ValueError('Masses are needed, but not found in the dump')
+    lookup = np.zeros(max(masses) + 1)
+    for key, val in masses.items():
+        lookup[key] = val
+    return lookup[atoms['type']]
+
+
+def needed_columns(keys, values, masses):
+    """Find the atom columns needed for the requested values."""
+    names, scaled, _ = coordinate_columns(keys)
+    columns = list(names)
+    need_mass = DENSITY_MASS in values or TEMPERATURE in values
+    if need_mass:
+        columns.append('mass' if 'mass' in keys else 'type')
+    if TEMPERATURE in values:
+        columns.extend(VELOCITIES)
+    for i in values:
+        if i not in (DENSITY_NUMBER, DENSITY_MASS, TEMPERATURE):
+            columns.append(i)
+    return list(dict.fromkeys(columns)), names, scaled
+
+
+def bin_frames(lmp, frames, axes, nbins, values, masses=None):
+    """Bin atoms for some frames and sum up the values in the bins.
+
+    This is the task executed by the worker processes.
+
+    Returns
+    -------
+    out : dict
+        The summed counts and values for each bin, the number of
+        frames, the last timestep, and the bin centers in the last
+        frame.
+    """
+    axis_idx = [AXES[i] for i in axes]
+    nbins_total = int(np.prod(nbins))
+    sums = {'count': np.zeros(nbins_total)}
+    for key in values:
+        sums[key] = np.zeros(nbins_total)
+    with IndexedTrajectory(lmp) as traj:
+        columns = None
+        for i in frames:
+            raw = traj.raw_frame(i)
+            if columns is None:
+                columns, names, scaled = needed_columns(
+                    atom_columns(raw), values, masses
+                )
+            data = frame_to_dict(raw, columns=columns)
+            atoms = data['atoms']
+            origin, params = box_parameters(data['box'])
+            matrix = box_matrices(params[np.newaxis, :])[0]
+            pos = np.column_stack([atoms[j] for j in names])
+            if not scaled:
+                pos = (pos - origin) @ np.linalg.inv(matrix).T
+            pos = pos[:, axis_idx]
+            pos -= np.floor(pos)
+            idx = np.minimum((pos * nbins).astype(int), np.array(nbins) - 1)
+            flat = np.ravel_multi_index(idx.T, nbins)
+            count = np.bincount(flat, minlength=nbins_total)
+            bin_volume = abs(np.linalg.det(matrix)) / nbins_total
+            sums['count'] += count
+            if DENSITY_MASS in values or TEMPERATURE in values:
+                mass = atom_masses(atoms, masses)
+            for key in values:
+                if key == DENSITY_NUMBER:
+                    sums[key] += count / bin_volume
+                elif key == DENSITY_MASS:
+                    sums[key] += np.bincount(
+                        flat, weights=mass, minlength=nbins_total
+                    ) / bin_volume
+                elif key == TEMPERATURE:
+                    mvv = mass * sum(atoms[j]**2 for j in VELOCITIES)
+                    sums[key] += np.bincount(
+                        flat, weights=mvv, minlength=nbins_total
+                    )
+                else:
+                    sums[key] += np.bincount(
+                        flat, weights=atoms[key], minlength=nbins_total
+                    )
+    lengths = params[axis_idx]
+    grid = np.meshgrid(
+        *[(np.arange(n) + 0.5) / n for n in nbins], indexing='ij'
+    )
+    centers = np.column_stack(
+        [origin[j] + g.ravel() * length
+         for j, g, length in zip(axis_idx, grid, lengths)]
+    )
+    sums['frames'] = len(frames)
+    sums['timestep'] = data['timestep']
+    sums['centers'] = centers
+    return sums
+
+
+def block_profile(sums, values, units='real'):
+    """Convert the sums for a block of frames to averaged values."""
+    boltz, mvv2e, mv2d = UNITS[units]
+    nframes = sums['frames']
+    count = sums['count']
+    profile = {'ncount': count / nframes}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for key in values:
+            if key == DENSITY_NUMBER:
+                profile[key] = sums[key] / nframes
+            elif key == DENSITY_MASS:
+                profile[key] = sums[key] * mv2d / nframes
+            elif key == TEMPERATURE:
+                profile[key] = sums[key] * mvv2e / (3.0 * count * boltz)
+            else:
+                profile[key] = sums[key] / count
+    for key, val in profile.items():
+        profile[key] = np.where(np.isfinite(val), val, 0.0)
+    return profile
+
+
+def build_profiles(lmp, axes, nbins, values, frames_per_block=1,
+                   masses=None, units='real', workers=None):
+    """Create profiles for blocks of frames in a trajectory.
+
+    Parameters
+    ----------
+    lmp : string or pathlib.Path
+        The trajectory to read.
+    axes : list of strings
+        The axes to bin along, for instance ``['z']``.
+    nbins : list of integers
+        The number of bins along each axis.
+    values : list of strings
+        What to calculate for each bin: ``'density/number'``,
+        ``'density/mass'``, ``'temp'`` or the name of a column in the
+        dump which is averaged.
+    frames_per_block : integer, optional
+        The number of frames averaged for each profile.
+    masses : dict, optional
+        The mass for each atom type, used if the dump does not contain
+        the masses.
+    units : string, optional
+        The LAMMPS units, used for the temperature and the mass
+        density (which is given in g/cm**3 for real and metal units,
+        as fix ave/chunk gives it).
+    workers : integer, optional
+        If given, the blocks are processed by this many worker
+        processes.
+
+    Yields
+    ------
+    out : tuple
+        The last timestep in the block, the bin centers, the average
+        total number of atoms, and the profiles as a dict.
+    """
+    with IndexedTrajectory(lmp) as traj:
+        nframes = len(traj)
+    blocks = [
+        range(i, min(i + frames_per_block, nframes))
+        for i in range(0, nframes, frames_per_block)
+    ]
+    args = [lmp, axes, nbins, values, masses]
+    if workers is None:
+        results = (bin_frames(args[0], i, *args[1:]) for i in blocks)
+        yield from _profiles(results, values, units)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(
+                bin_frames, *zip(*[[args[0], i] + args[1:] for i in blocks])
+            )
+            yield from _profiles(results, values, units)
+
+
+def _profiles(results, values, units):
+    """Convert the sums from the blocks to profiles."""
+    for sums in results:
+        profile = block_profile(sums, values, units=units)
+        total = sums['count'].sum() / sums['frames']
+        yield sums['timestep'], sums['centers'], total, profile
+
+
+def write_profiles(filename, lmp, axes, nbins, values, **kwargs):
+    """Create profiles and store them in the LAMMPS ave/chunk format.
+
+    The keyword arguments are passed on to :py:func:`.build_profiles`.
+    """
+    keys = ['Chunk'] + [f'Coord{i + 1}' for i in range(len(axes))]
+    keys += ['Ncount'] + list(values)
+    print('Writing file "{}"'.format(filename))
+    with open(filename, 'w') as output:
+        output.write(f'# Chunk-averaged data for {lmp}\n')
+        output.write('# Timestep Number-of-chunks Total-count\n')
+        output.write('# {}\n'.format(' '.join(keys)))
+        for step, centers, total, profile in build_profiles(
+                lmp, axes, nbins, values, **kwargs):
+            output.write(f'{step} {len(centers)} {total:g}\n')
+            columns = [np.arange(1, len(centers) + 1), centers]
+            columns += [profile['ncount']] + [profile[i] for i in values]
+            np.savetxt(output, np.column_stack(columns),
+                       fmt=['%d'] + ['%g'] * (len(keys) - 1))
+
+
+def parse_masses(text):
+    """Read masses given as "1:12.011,2:1.008"."""
+    if text is None:
+        return None
+    masses = {}
+    for i in text.split(','):
+        key, val = i.split(':')
+        masses[int(key)] = float(val)
+    return masses
+
+
+def create_parser():
+    """Create a parser."""
+    parser = argparse.ArgumentParser(
+        description='Create profiles from a LAMMPS trajectory'
+    )
+    parser.add_argument('infile', help='Trajectory to read')
+    parser.add_argument(
+        '-a',
+        '--axes',
+        help='Axes to bin along, for instance "z" or "x,z"',
+        default='z',
+    )
+    parser.add_argument(
+        '-b',
+        '--bins',
+        help='Number of bins along each axis, for instance "50" or "10,50"',
+        default='50',
+    )
+    parser.add_argument(
+        '-v',
+        '--values',
+        help='Values to calculate, for instance "density/number,temp,vx"',
+        default='density/number',
+    )
+    parser.add_argument(
+        '-n',
+        '--frames',
+        help='Number of frames to average in each profile',
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        '-m',
+        '--masses',
+        help='Masses for the atom types, for instance "1:12.011,2:1.008"',
+        required=False,
+    )
+    parser.add_argument(
+        '-u',
+        '--units',
+        help='The LAMMPS units',
+        choices=sorted(UNITS),
+        default='real',
+    )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        help='Number of worker processes',
+        type=int,
+        required=False,
+    )
+    return parser
+
+
+if __name__ == '__main__':
+    ARGS = create_parser().parse_args()
+    write_profiles(
+        'profile-{}.txt'.format(pathlib.Path(ARGS.infile).stem),
+        ARGS.infile,
+        ARGS.axes.split(','),
+        [int(i) for i in ARGS.bins.split(',')],
+        ARGS.values.split(','),
+        frames_per_block=ARGS.frames,
+        masses=parse_masses(ARGS.masses),
+        units=ARGS.units,
+        workers=ARGS.workers,
+    )
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+"""Calculate radial distribution functions from a lammpstrj file.
+
+Pairs of atoms are found with a cell list, so the work for each frame
+scales linearly with the number of atoms. Periodic (orthogonal and
+triclinic) boxes are supported, and all the requested pairs of atom
+types are handled in the same pass over the trajectory.
+
+The output is written in the format of ``fix ave/time ... mode vector``
+for ``compute rdf``, so that it can be averaged with
+``average_lammps_rdf.py``.
+"""
+import argparse
+import itertools
+import pathlib
+import numpy as np
+from array_lammpstrj import (
+    atom_columns,
+    box_matrices,
+    box_parameters,
+    coordinate_columns,
+)
+from read_lammpstrj import frame_to_dict, read_lammpstrj_slice
+
+
+# The maximum number of pairs to consider at once:
+MAX_PAIRS = 2**22
+
+
+def box_widths(matrix):
+    """Return the distances between opposite faces of a box."""
+    volume = abs(np.linalg.det(matrix))
+    vec = matrix.T
+    return np.array([
+        volume / np.linalg.norm(np.cross(vec[1], vec[2])),
+        volume / np.linalg.norm(np.cross(vec[2], vec[0])),
+        volume / np.linalg.norm(np.cross(vec[0], vec[1])),
+    ])
+
+
+def pair_histogram(frac, matrix, type_idx, ntypes, rmax, nbins):
+    """Histogram the pair distances in a frame, for all pairs of types.
+
+    Parameters
+    ----------
+    frac : numpy.array
+        The fractional coordinates of the atoms, shape ``(n_atoms, 3)``.
+    matrix : numpy.array
+        The box vectors, as columns.
+    type_idx : numpy.array of integers
+        The type of each atom, numbered from 0.
+    ntypes : integer
+        The number of types.
+    rmax : float
+        The largest distance to consider, at most half the width of
+        the box.
+    nbins : integer
+        The number of bins for the distances.
+
+    Returns
+    -------
+    out : numpy.array
+        The counts with shape ``(ntypes, ntypes, nbins)``. Element
+        ``[i, j, k]`` counts atoms of type j in bin k around the atoms
+        of type i.
+    """
+    widths = box_widths(matrix)
+    if rmax > 0.5 * widths.min():
+        raise ValueError(
+            f'rmax ({rmax}) is larger than half the box ({widths.min()})'
+        )
+    frac = frac - np.floor(frac)
+    # Cells are at least rmax wide, with less than 3 cells in a
+    # direction, all atoms are considered along it:
+    ncells = np.floor(widths / rmax).astype(int)
+    ncells[ncells < 3] = 1
+    cell3 = np.minimum((frac * ncells).astype(int), ncells - 1)
+    cell = np.ravel_multi_index(cell3.T, ncells)
+    order = np.argsort(cell, kind='stable')
+    counts = np.bincount(cell, minlength=np.prod(ncells))
+    starts = np.cumsum(counts) - counts
+    offsets = itertools.product(
+        *[(-1, 0, 1) if i >= 3 else (0,) for i in ncells]
+    )
+    hist = np.zeros(ntypes * ntypes * nbins, dtype=np.int64)
+    natoms = len(frac)
+    chunk = max(1, MAX_PAIRS // max(1, counts.max()))
+    dr = rmax / nbins
+    for offset in offsets:
+        neighbour = np.ravel_multi_index(
+            ((cell3 + offset) % ncells).T, ncells
+        )
+        for first in range(0, natoms, chunk):
+            atom_a = np.arange(first, min(first + chunk, natoms))
+            size = counts[neighbour[atom_a]]
+            total = size.sum()
+            if total == 0:
+                continue
+            atom_a = np.repeat(atom_a, size)
+            within = np.arange(total) - np.repeat(np.cumsum(size) - size,
+                                                  size)
+            atom_b = order[starts[neighbour[atom_a]] + within]
+            keep = atom_a != atom_b
+            atom_a, atom_b = atom_a[keep], atom_b[keep]
+            delta = frac[atom_b] - frac[atom_a]
+            delta -= np.rint(delta)
+            delta = delta @ matrix.T
+            dist = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+            keep = dist < rmax
+            bins = np.minimum((dist[keep] / dr).astype(int), nbins - 1)
+            code = (
+                type_idx[atom_a[keep]] * ntypes + type_idx[atom_b[keep]]
+            ) * nbins + bins
+            hist += np.bincount(code, minlength=len(hist))
+    return hist.reshape(ntypes, ntypes, nbins)
+
+
+def frame_fractional(data, names, scaled):
+    """Get the fractional coordinates, the types and the box of a frame."""
+    origin, params = box_parameters(data['box'])
+    matrix = box_matrices(params[np.newaxis, :])[0]
+    atoms = data['atoms']
+    pos = np.column_stack([atoms[i] for i in names])
+    if not scaled:
+        pos = (pos - origin) @ np.linalg.inv(matrix).T
+    return pos, atoms['type'], matrix
+
+
+def calculate_rdf(lmp, pairs, rmax, nbins=100, frames_per_block=1,
+                  start=None, stop=None, step=None):
+    """Calculate RDFs and coordination numbers from a trajectory.
+
+    Parameters
+    ----------
+    lmp : string or pathlib.Path
+        The trajectory to read.
+    pairs : list of tuples of integers
+        The pairs of atom types to calculate the RDF for.
+    rmax : float
+        The largest distance to consider.
+    nbins : integer, optional
+        The number of bins.
+    frames_per_block : integer, optional
+        The RDFs are averaged over this many frames before they are
+        given.
+    start, stop, step : integers, optional
+        The frames to use, as for ``frames[start:stop:step]``.
+
+    Yields
+    ------
+    out : tuple
+        The last timestep in the block, the bin centers and, for each
+        pair, the RDF and the coordination number.
+    """
+    dr = rmax / nbins
+    edges = np.arange(nbins + 1) * dr
+    center = 0.5 * (edges[1:] + edges[:-1])
+    shell = 4.0 / 3.0 * np.pi * (edges[1:]**3 - edges[:-1]**3)
+    all_types = sorted({i for pair in pairs for i in pair})
+    names = None
+    block = []
+    for frame in read_lammpstrj_slice(lmp, start, stop, step):
+        if names is None:
+            names, scaled, _ = coordinate_columns(atom_columns(frame))
+        data = frame_to_dict(frame, columns=['type'] + list(names))
+        frac, types, matrix = frame_fractional(data, names, scaled)
+        type_idx = np.searchsorted(all_types, types)
+        known = np.isin(types, all_types)
+        hist = pair_histogram(frac[known], matrix, type_idx[known],
+                              len(all_types), rmax, nbins)
+        volume = abs(np.linalg.det(matrix))
+        number = {i: np.count_nonzero(types == i) for i in all_types}
+        result = []
+        for type_a, type_b in pairs:
+            idx_a = all_types.index(type_a)
+            idx_b = all_types.index(type_b)
+            count = hist[idx_a, idx_b]
+            n_a = number[type_a]
+            n_b = number[type_b] - (1 if type_a == type_b else 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rdf = count * volume / (n_a * n_b * shell)
+                coord = np.cumsum(count) / n_a
+            result.append((rdf, coord))
+        block.append(result)
+        if len(block) == frames_per_block:
+            yield data['timestep'], center, np.mean(block, axis=0)
+            block = []
+    if block:
+        yield data['timestep'], center, np.mean(block, axis=0)
+
+
+def write_rdf(filename, lmp, pairs, rmax, nbins=100, frames_per_block=1,
+              name='rdf'):
+    """Calculate RDFs and store them in the LAMMPS ave/time format."""
+    keys = ['Row', f'c_{name}[1]']
+    for i in range(len(pairs)):
+        keys.append(f'c_{name}[{2 * i + 2}]')
+        keys.append(f'c_{name}[{2 * i + 3}]')
+    print('Writing file "{}"'.format(filename))
+    with open(filename, 'w') as output:
+        output.write(f'# Time-averaged data for {lmp}\n')
+        output.write('# TimeStep Number-of-rows\n')
+        output.write('# {}\n'.format(' '.join(keys)))
+        for step, center, result in calculate_rdf(
+                lmp, pairs, rmax, nbins=nbins,
+                frames_per_block=frames_per_block):
+            output.write(f'{step} {nbins}\n')
+            columns = [np.arange(1, nbins + 1), center]
+            for rdf, coord in result:
+                columns.extend([rdf, coord])
+            np.savetxt(output, np.column_stack(columns),
+                       fmt=['%d'] + ['%g'] * (len(columns) - 1))
+
+
+def parse_pairs(text):
+    """Read pairs of types given as "1-1,1-2"."""
+    return [
+        tuple(int(j) for j in i.split('-')) for i in text.split(',')
+    ]
+
+
+def create_parser():
+    """Create a parser."""
+    parser = argparse.ArgumentParser(
+        description='Calculate RDFs from a LAMMPS trajectory'
+    )
+    parser.add_argument('infile', help='Trajectory to read')
+    parser.add_argument(
+        '-r',
+        '--rmax',
+        help='Largest distance to consider',
+        type=float,
+        required=True,
+    )
+    parser.add_argument(
+        '-p',
+        '--pairs',
+        help='Pairs of atom types, for instance "1-1,1-2"',
+        required=True,
+    )
+    parser.add_argument(
+        '-b',
+        '--bins',
+        help='Number of bins',
+        type=int,
+        default=100,
+    )
+    parser.add_argument(
+        '-n',
+        '--frames',
+        help='Number of frames to average in each output block',
+        type=int,
+        default=1,
+    )
+    return parser
+
+
+if __name__ == '__main__':
+    ARGS = create_parser().parse_args()
+    write_rdf(
+        'rdf-{}.txt'.format(pathlib.Path(ARGS.infile).stem),
+        ARGS.infile,
+        parse_pairs(ARGS.pairs),
+        ARGS.rmax,
+        nbins=ARGS.bins,
+        frames_per_block=ARGS.frames,
+    )
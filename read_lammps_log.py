@@ -1,9 +1,10 @@
 """Read data from a LAMMPS log file."""
+import io
 from math import ceil
+import mmap
+import os
 import sys
 import numpy as np
-from matplotlib import pyplot as plt
-plt.style.use('seaborn-talk')
 
 
 def read_lammps_log(logfile):
@@ -40,8 +41,229 @@ def read_lammps_log(logfile):
         yield keys, data
 
 
-def plot_all_items(data):
-    """Plot all items in the given dictionary."""
+# Characters which can start a line of thermo output:
+NUMBER_START = b'+-.0123456789'
+# Approximate size (in bytes) of the chunks of thermo output parsed at
+# a time by read_lammps_log_chunks:
+CHUNK_SIZE = 2**22
+
+
+def find_line(mem, prefix, pos=0):
+    """Find the start of the next line starting with prefix."""
+    if pos == 0 and mem[:len(prefix)] == prefix:
+        return 0
+    found = mem.find(b'\n' + prefix, max(pos - 1, 0))
+    return -1 if found == -1 else found + 1
+
+
+def find_thermo_blocks(mem):
+    """Locate the blocks of thermo output in a log file.
+
+    A block starts with a line starting with "Step" and ends at the
+    next line starting with "Loop time" or "Step", as in
+    :py:func:`.read_lammps_log`.
+
+    Yields
+    ------
+    out : tuple of integers
+        The start of the header line and the start and end of the
+        data lines following it.
+    """
+    start = find_line(mem, b'Step')
+    while start != -1:
+        begin = mem.find(b'\n', start)
+        if begin == -1:
+            return
+        begin += 1
+        step = find_line(mem, b'Step', begin)
+        loop = find_line(mem, b'Loop time', begin)
+        ends = [i for i in (loop, step) if i != -1]
+        yield start, begin, min(ends) if ends else len(mem)
+        start = step
+
+
+def parse_thermo_lines(lines, ncol):
+    """Parse lines of thermo output one at a time.
+
+    Lines which are not numbers, or have the wrong number of values,
+    are skipped.
+    """
+    data = []
+    for line in lines:
+        try:
+            new_data = [float(i) for i in line.split()]
+        except ValueError:
+            continue
+        if len(new_data) != ncol:
+            print('Inconsistent length of data --- skipping.')
+        else:
+            data.append(new_data)
+    return np.array(data, dtype=float).reshape(-1, ncol)
+
+
+def parse_thermo_block(block, ncol, usecols=None):
+    """Parse a block of thermo output into a 2D array.
+
+    The block is parsed by a single call to numpy. If this fails, the
+    lines which do not start with a number (for instance, warnings)
+    or have the wrong number of values are removed, and the remaining
+    lines are parsed in one call again. Only if this also fails, the
+    lines are parsed one at a time by :py:func:`.parse_thermo_lines`.
+
+    Parameters
+    ----------
+    block : bytes
+        The lines of thermo output.
+    ncol : integer
+        The number of values on each line.
+    usecols : list of integers, optional
+        If given, only these columns are converted and returned. The
+        last column is also read, so that lines which are cut short
+        are found.
+    """
+    cols = None if usecols is None else sorted(set(usecols) | {ncol - 1})
+    pick = slice(None) if cols is None else [cols.index(i) for i in usecols]
+    try:
+        data = np.loadtxt(io.BytesIO(block), ndmin=2, comments=None,
+                          usecols=cols)
+        if data.shape[1] == ncol or cols is not None:
+            return data[:, pick]
+    except ValueError:
+        pass
+    lines = []
+    for line in block.splitlines():
+        if not line.strip() or line.lstrip()[:1] not in NUMBER_START:
+            continue
+        if len(line.split()) != ncol:
+            print('Inconsistent length of data --- skipping.')
+            continue
+        lines.append(line)
+    if not lines:
+        return np.zeros((0, ncol if usecols is None else len(usecols)))
+    try:
+        return np.loadtxt(lines, ndmin=2, comments=None, usecols=cols)[:, pick]
+    except ValueError:
+        data = parse_thermo_lines(lines, ncol)
+        return data if usecols is None else data[:, usecols]
+
+
+def read_lammps_log_arrays(logfile):
+    """Read the thermo output from a LAMMPS log file into arrays.
+
+    This gives the same data as :py:func:`.read_lammps_log`, but each
+    block of thermo output is located by its byte range and parsed in
+    one go. Lines in the block which are not thermo output (for
+    instance, warnings) are skipped.
+
+    Yields
+    ------
+    out : tuple
+        The keys (lower case) and a 2D array with one row for each
+        line of thermo output.
+    """
+    with open(logfile, 'rb') as infile:
+        if os.fstat(infile.fileno()).st_size == 0:
+            return
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mem:
+            for start, begin, end in find_thermo_blocks(mem):
+                keys = [i.lower() for i in mem[start:begin].decode().split()]
+                data = parse_thermo_block(mem[begin:end], len(keys))
+                if len(data) > 0:
+                    yield keys, data
+
+
+def read_lammps_log_chunks(logfile, chunk_size=CHUNK_SIZE):
+    """Read the thermo output from a LAMMPS log file in chunks.
+
+    This works as :py:func:`.read_lammps_log_arrays`, but each block of
+    thermo output is split into chunks of whole lines, of about
+    ``chunk_size`` bytes, which are parsed one at a time. The memory
+    needed does not depend on the length of the runs.
+
+    Yields
+    ------
+    out : tuple
+        The number of the block of thermo output (the run), the keys
+        and a 2D array with the rows in the chunk.
+    """
+    with open(logfile, 'rb') as infile:
+        if os.fstat(infile.fileno()).st_size == 0:
+            return
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mem:
+            for run, (start, begin, end) in enumerate(
+                    find_thermo_blocks(mem)):
+                keys = [i.lower() for i in mem[start:begin].decode().split()]
+                while begin < end:
+                    if begin + chunk_size >= end:
+                        stop = end
+                    else:
+                        stop = mem.rfind(b'\n', begin, begin + chunk_size)
+                        if stop == -1:  # a line longer than the chunk
+                            stop = mem.find(b'\n', begin + chunk_size, end)
+                        stop = end if stop == -1 else stop + 1
+                    data = parse_thermo_block(mem[begin:stop], len(keys))
+                    begin = stop
+                    if len(data) > 0:
+                        yield run, keys, data
+
+
+def decimate_indices(ydata, buckets):
+    """Select the points to draw for a series, min/max per bucket.
+
+    The series is split into (about) ``buckets`` equally long buckets
+    and the smallest and largest value in each bucket is kept, so
+    that peaks and spikes are still drawn. A NaN in a bucket is kept
+    instead, so it shows as a gap.
+
+    Returns
+    -------
+    out : numpy.array of integers
+        The indices of the points to draw, in increasing order. All
+        points are kept if there are less than two for each bucket.
+    """
+    ydata = np.asarray(ydata)
+    length = len(ydata)
+    if buckets < 1 or length <= 2 * buckets:
+        return np.arange(length)
+    size = -(-length // buckets)
+    full = length // size
+    body = ydata[:full * size].reshape(full, size)
+    starts = np.arange(full) * size
+    idx = [starts + np.argmin(body, axis=1), starts + np.argmax(body, axis=1)]
+    if full * size < length:
+        tail = ydata[full * size:]
+        idx.append(full * size + np.array([np.argmin(tail), np.argmax(tail)]))
+    return np.unique(np.concatenate(idx))
+
+
+def axes_pixels(axes):
+    """Return the width of a plot, in pixels."""
+    return int(np.ceil(axes.get_window_extent().width))
+
+
+def import_pyplot():
+    """Import pyplot and set the plot style.
+
+    pyplot is only imported when something is plotted, so that the
+    readers can be used without a display.
+    """
+    from matplotlib import pyplot as plt
+    try:
+        plt.style.use('seaborn-talk')
+    except OSError:  # renamed in matplotlib 3.6
+        plt.style.use('seaborn-v0_8-talk')
+    return plt
+
+
+def plot_all_items(data, decimate=True):
+    """Plot all items in the given dictionary.
+
+    With ``decimate``, the series are reduced to the smallest and
+    largest value for each pixel of the plot before they are drawn
+    (see :py:func:`.decimate_indices`), while the averages are still
+    calculated from all the data.
+    """
+    plt = import_pyplot()
     ncol = 1 if len(data) < 3 else 2
     nrow = ceil(len(data) / ncol)
     fig, axes = plt.subplots(constrained_layout=True, nrows=nrow, ncols=ncol)
@@ -51,19 +273,32 @@ def plot_all_items(data):
         axes = [axes]
     for i, (key, val) in enumerate(data.items()):
         axi = axes[i]
-        xpos = np.arange(len(val))
-        axi.plot(xpos, val, lw=3, alpha=0.8)
+        val = np.asarray(val)
+        if decimate:
+            xpos = decimate_indices(val, axes_pixels(axi))
+        else:
+            xpos = np.arange(len(val))
+        axi.plot(xpos, val[xpos], lw=3, alpha=0.8)
         axi.axhline(y=np.average(val), lw=3, ls='--', color='#262626',
                     alpha=0.8)
         axi.set(xlabel='Step no.', ylabel=key)
     return fig, axes
 
 
-def plot_selected_items(xdata, data, selection, add_average=False):
-    """Plot some selected data in the same plot."""
+def plot_selected_items(xdata, data, selection, add_average=False,
+                        decimate=True):
+    """Plot some selected data in the same plot.
+
+    The series are decimated as in :py:func:`.plot_all_items`.
+    """
+    plt = import_pyplot()
     fig, ax1 = plt.subplots(constrained_layout=True)
     for key in selection:
-        line, = ax1.plot(xdata, data[key], lw=3, alpha=0.8, label=key)
+        idx = slice(None)
+        if decimate:
+            idx = decimate_indices(data[key], axes_pixels(ax1))
+        line, = ax1.plot(np.asarray(xdata)[idx], np.asarray(data[key])[idx],
+                         lw=3, alpha=0.8, label=key)
         if add_average:
             ax1.axhline(y=np.average(data[key]), lw=3, ls=':',
                         color=line.get_color(), alpha=0.8)
@@ -73,13 +308,12 @@ def plot_selected_items(xdata, data, selection, add_average=False):
 
 def main(logfile):
     """Read a LAMMPS log and plot some selected data."""
-    for keys, data in read_lammps_log(logfile):
+    for keys, data_matrix in read_lammps_log_arrays(logfile):
         print('Set found')
         print('Keys:')
         for i in keys:
             print(f'- {i}')
-        print(f'Length: {len(data)}')
-        data_matrix = np.array(data)
+        print(f'Length: {len(data_matrix)}')
         data_dict = {}
         for i, key in enumerate(keys):
             data_dict[key] = data_matrix[:, i]
@@ -90,7 +324,7 @@ def main(logfile):
             ['temp'],
             add_average=True
         )
-    plt.show()
+    import_pyplot().show()
 
 
 if __name__ == '__main__':
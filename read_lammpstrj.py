@@ -1,4 +1,13 @@
 """Read a LAMMPS trajectory created from a dump."""
+import bz2
+from collections.abc import Mapping
+import gzip
+import io
+import itertools
+import lzma
+import mmap
+import os
+import pathlib
 import sys
 import numpy as np
 
@@ -6,6 +15,39 @@ import numpy as np
 # Format for GROMACS gro files:
 _GRO_FMT = '{0:5d}{1:5s}{2:5s}{3:5d}{4:8.3f}{5:8.3f}{6:8.3f}'
 _GRO_BOX_FMT = '{:15.9f}'
+# Formats for writing many frames, the coordinates are formatted
+# with the % operator:
+_GRO_ATOM_FMT = '{0:5d}{1:5s}{2:5s}{3:5d}'
+_GRO_XYZ_FMT = '%8.3f%8.3f%8.3f\n'
+
+# Numpy types used for the guessed formats of the atom data:
+_NUMPY_TYPES = {int: np.int64, float: np.float64, str: object}
+# Atom columns which always hold integers:
+INTEGER_COLUMNS = {'id', 'type', 'mol', 'proc', 'procp1', 'ix', 'iy', 'iz'}
+
+# Compressed formats we can read, given by the file suffix:
+COMPRESSION = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.lzma': 'xz'}
+_OPENERS = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+# Size of the blocks read from compressed files:
+CHUNK_SIZE = 2**22
+# Number of bytes of atom lines parsed at a time into reused arrays:
+REUSED_BYTES = 2**20
+
+
+def format_gro_box(box):
+    """Format the box vectors for a gro file."""
+    blx = 0.1 * (box['xhi'] - box['xlo'])
+    bly = 0.1 * (box['yhi'] - box['ylo'])
+    blz = 0.1 * (box['zhi'] - box['zlo'])
+    box_length = [blx, bly, blz]
+    if 'xy' in box:
+        box_length.extend(
+            [
+                0.0, 0.0, box['xy'] * 0.1, 0.0,
+                box['xz'] * 0.1, box['yz'] * 0.1
+            ]
+        )
+    return ' '.join([_GRO_BOX_FMT.format(i) for i in box_length])
 
 
 def write_gro_file(outputfile, data, atom_names=None, mode='w'):
@@ -56,19 +98,162 @@ def write_gro_file(outputfile, data, atom_names=None, mode='w'):
             output.write(f'{buff}\n')
         box = data.get('box', None)
         if box is not None:
-            blx = 0.1 * (box['xhi'] - box['xlo'])
-            bly = 0.1 * (box['yhi'] - box['ylo'])
-            blz = 0.1 * (box['zhi'] - box['zlo'])
-            box_length = [blx, bly, blz]
-            if 'xy' in box:
-                box_length.extend(
-                    [
-                        0.0, 0.0, box['xy'] * 0.1, 0.0,
-                        box['xz'] * 0.1, box['yz'] * 0.1
-                    ]
-                )
-            box_str = ' '.join([_GRO_BOX_FMT.format(i) for i in box_length])
-            output.write(f'{box_str}\n')
+            output.write(f'{format_gro_box(box)}\n')
+
+
+def gro_atom_template(atoms, idx, atom_names=None):
+    """Create a format string for the atoms of a frame in a gro file.
+
+    Everything but the coordinates is formatted here, and the
+    template can be reused for frames with the same atoms. The
+    coordinates are filled in with ``template % tuple(xyz)``.
+    """
+    number = len(idx)
+    mol = atoms['mol'][idx] if 'mol' in atoms else np.ones(number, int)
+    types = atoms['type'][idx] if 'type' in atoms else np.ones(number, int)
+    if atom_names is not None and len(atom_names) > 0:
+        names = [str(i) for i in np.asarray(atom_names)[idx]]
+    else:
+        names = [f'X{i}' for i in types]
+    template = []
+    for mol_idx, atom_name, atom_type in zip(mol.tolist(), names,
+                                             types.tolist()):
+        prefix = _GRO_ATOM_FMT.format(mol_idx, 'MOL', atom_name, atom_type)
+        template.append(prefix.replace('%', '%%'))
+        template.append(_GRO_XYZ_FMT)
+    return ''.join(template)
+
+
+def _same_atoms(key1, key2):
+    """Check if the arrays describing the atoms of two frames match."""
+    if key1 is None or key2 is None:
+        return False
+    for val1, val2 in zip(key1, key2):
+        if val1 is None and val2 is None:
+            continue
+        if val1 is None or val2 is None or not np.array_equal(val1, val2):
+            return False
+    return True
+
+
+def write_gro_trajectory(outputfile, frames, atom_names=None, mode='w',
+                         buffer_size=2**22):
+    """Write several frames to a gro file.
+
+    The output is the same as calling :py:func:`.write_gro_file` for
+    each frame, but the file is only opened once, each frame is
+    formatted with a single string operation, and the sorting and
+    formatting of the atoms is reused as long as the atoms (ids,
+    molecules, types and names) do not change.
+
+    Parameters
+    ----------
+    outputfile : string or pathlib.Path
+        The gro file to write.
+    frames : iterable of dicts
+        The frames, as given by :py:func:`.frame_to_dict`.
+    atom_names : list of strings, optional
+        Names for the atoms. If not given, the "element" column is
+        used when present.
+    mode : string, optional
+        The mode used for opening the output file.
+    buffer_size : integer, optional
+        The size of the output buffer.
+
+    Returns
+    -------
+    out : integer
+        The number of frames written.
+    """
+    key = None
+    idx = None
+    template = None
+    nframes = 0
+    with open(outputfile, mode, buffering=buffer_size) as output:
+        for data in frames:
+            atoms = data['atoms']
+            names = atom_names
+            if names is None:
+                names = atoms.get('element')
+            new_key = [atoms.get(i) for i in ('id', 'mol', 'type')]
+            new_key.append(names)
+            if not _same_atoms(key, new_key):
+                if 'id' in atoms:
+                    idx = np.argsort(atoms['id'])
+                else:
+                    idx = np.arange(len(atoms['x']))
+                template = gro_atom_template(atoms, idx, atom_names=names)
+                key = new_key
+            xyz = np.column_stack(
+                (atoms['x'][idx], atoms['y'][idx], atoms['z'][idx])
+            ) * 0.1
+            step = data.get('timestep', 0)
+            buff = [
+                f'Converted from LAMMPS data, step {step}\n',
+                f'{len(idx)}\n',
+                template % tuple(xyz.ravel().tolist()),
+            ]
+            box = data.get('box', None)
+            if box is not None:
+                buff.append(f'{format_gro_box(box)}\n')
+            output.write(''.join(buff))
+            nframes += 1
+    return nframes
+
+
+def lammpstrj_to_gro(lmp, outputfile, atom_names=None):
+    """Convert all frames in a lammpstrj file to a gro file."""
+    frames = (frame_to_dict(frame) for frame in read_lammpstrj_slice(lmp))
+    return write_gro_trajectory(outputfile, frames, atom_names=atom_names)
+
+
+def format_lammpstrj_frame(data, float_format='%r'):
+    """Format a frame in the lammpstrj format.
+
+    Parameters
+    ----------
+    data : dict or object like Frame
+        The frame, as given by :py:func:`.frame_to_dict` or
+        :py:func:`.read_frame`. Only the timestep, the box and the
+        atoms are written.
+    float_format : string, optional
+        The format for the atom columns which are not integers or
+        strings. The default writes the shortest text which gives back
+        the same double, so no digits are lost, also for values read
+        from binary dumps.
+
+    Returns
+    -------
+    out : string
+        The frame, with the number of atoms given by the atom data.
+    """
+    atoms = data['atoms']
+    box = data['box']
+    natoms = len(next(iter(atoms.values()), ()))
+    buff = [
+        f'ITEM: TIMESTEP\n{data["timestep"]}\n',
+        f'ITEM: NUMBER OF ATOMS\n{natoms}\n',
+        'ITEM: BOX BOUNDS {}\n'.format(' '.join(box['bounds'])),
+    ]
+    for dim, tilt in zip('xyz', ('xy', 'xz', 'yz')):
+        line = [repr(float(box[f'{dim}lo'])), repr(float(box[f'{dim}hi']))]
+        if tilt in box:
+            line.append(repr(float(box[tilt])))
+        buff.append(' '.join(line) + '\n')
+    buff.append('ITEM: ATOMS {}\n'.format(' '.join(atoms)))
+    fmt = []
+    for val in atoms.values():
+        if np.issubdtype(val.dtype, np.integer):
+            fmt.append('%d')
+        elif np.issubdtype(val.dtype, np.floating):
+            fmt.append(float_format)
+        else:
+            fmt.append('%s')
+    if natoms > 0:
+        rows = zip(*(val.tolist() for val in atoms.values()))
+        template = (' '.join(fmt) + '\n') * natoms
+        buff.append(template % tuple(itertools.chain.from_iterable(rows)))
+    return ''.join(buff)
 
 
 def guess_string_format(string):
@@ -84,10 +269,23 @@ def guess_string_format(string):
             return str
 
 
+def compression_format(lmp):
+    """Return the compression format of a file, None if uncompressed."""
+    return COMPRESSION.get(pathlib.Path(lmp).suffix.lower())
+
+
+def open_trajectory(lmp, mode='rt'):
+    """Open a trajectory file, decompressing it if needed."""
+    fmt = compression_format(lmp)
+    if fmt is None:
+        return open(lmp, mode)
+    return _OPENERS[fmt](lmp, mode)
+
+
 def read_lammpstrj(lmp):
     """Iterate frames in a lammpstrj file."""
     raw = []
-    with open(lmp, 'r') as infile:
+    with open_trajectory(lmp, 'rt') as infile:
         for lines in infile:
             if lines.startswith('ITEM: TIMESTEP'):
                 if raw:
@@ -98,6 +296,150 @@ def read_lammpstrj(lmp):
         yield raw
 
 
+def iter_frame_ranges(mem):
+    """Iterate over the byte ranges of the frames in a memory map."""
+    pos = mem.find(b'ITEM: TIMESTEP')
+    while pos != -1:
+        end = mem.find(b'ITEM: TIMESTEP', pos + 1)
+        yield pos, len(mem) if end == -1 else end
+        pos = end
+
+
+def iter_stream_frames(stream, chunk_size=CHUNK_SIZE):
+    """Iterate over the frames in a binary stream.
+
+    This is used for files we can not memory map, for instance
+    compressed files. Data before the first frame is skipped.
+
+    Yields
+    ------
+    out : tuple of integer and bytes
+        The offset of the frame in the stream and the frame.
+    """
+    marker = b'ITEM: TIMESTEP'
+    buff = bytearray()
+    base = 0  # offset of buff in the stream
+    start = -1  # start of the current frame in buff
+    search = 0  # where to continue the search for new frames in buff
+    while True:
+        chunk = stream.read(chunk_size)
+        buff += chunk
+        pos = buff.find(marker, search)
+        while pos != -1:
+            if start != -1:
+                yield base + start, bytes(buff[start:pos])
+            start = pos
+            pos = buff.find(marker, pos + 1)
+        if not chunk:
+            break
+        # Drop the data we are done with:
+        drop = start if start != -1 else max(len(buff) - len(marker), 0)
+        del buff[:drop]
+        base += drop
+        start = 0 if start != -1 else -1
+        search = max(len(buff) - len(marker) + 1, start + 1)
+    if start != -1:
+        yield base + start, bytes(buff[start:])
+
+
+def release_pages(mem, begin, end):
+    """Let the system drop the memory mapped pages of a read frame.
+
+    The pages are read from the file again if they are used later, so
+    this only keeps the resident memory small for large files.
+    """
+    if not hasattr(mmap, 'MADV_DONTNEED'):  # not available on Windows
+        return
+    begin -= begin % mmap.PAGESIZE
+    end -= end % mmap.PAGESIZE
+    if end > begin:
+        mem.madvise(mmap.MADV_DONTNEED, begin, end - begin)
+
+
+def iter_frame_buffers(lmp, chunk_size=CHUNK_SIZE):
+    """Iterate over the frames in a lammpstrj file, as byte ranges.
+
+    Yields
+    ------
+    out : tuple
+        A buffer and the start and end of the frame in it. For plain
+        files, the buffer is a memory map of the whole file, and for
+        compressed files it is the decompressed frame.
+    """
+    if hasattr(lmp, 'iter_frame_buffers'):
+        # A trajectory split over several files:
+        yield from lmp.iter_frame_buffers()
+        return
+    if compression_format(lmp) is not None:
+        with open_trajectory(lmp, 'rb') as stream:
+            for _, frame in iter_stream_frames(stream, chunk_size):
+                yield frame, 0, len(frame)
+        return
+    with open(lmp, 'rb') as infile:
+        if os.fstat(infile.fileno()).st_size == 0:
+            return
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mem:
+            for begin, end in iter_frame_ranges(mem):
+                yield mem, begin, end
+                release_pages(mem, begin, end)
+
+
+def read_timestep(mem, pos):
+    """Read the timestep for the frame starting at pos."""
+    start = mem.find(b'\n', pos) + 1
+    end = mem.find(b'\n', start)
+    if start == 0 or end == -1:
+        return None
+    try:
+        return int(mem[start:end])
+    except ValueError:
+        return None
+
+
+def read_lammpstrj_slice(lmp, start=None, stop=None, step=None,
+                         timestep=False):
+    """Iterate over a slice of the frames in a lammpstrj file.
+
+    The frames are given as lists of lines, like
+    :py:func:`.read_lammpstrj` gives them, but frames outside the
+    slice are only located in the file: they are not decoded or split
+    into lines. For compressed files, the frames outside the slice
+    still have to be decompressed.
+
+    Parameters
+    ----------
+    lmp : string, pathlib.Path or object like MultiTrajectory
+        The trajectory to read, see ``multi_lammpstrj.py`` for
+        trajectories split over several files.
+    start, stop, step : integers, optional
+        The slice to read, as for ``frames[start:stop:step]``.
+        Negative values are not supported.
+    timestep : boolean, optional
+        If True, start, stop and step are given in timesteps, for
+        instance, ``start=1000, stop=5000, step=100`` gives the frames
+        for timesteps 1000, 1100, ..., 4900. The timesteps are assumed
+        to increase through the file.
+    """
+    start = 0 if start is None else start
+    step = 1 if step is None else step
+    if start < 0 or (stop is not None and stop < 0) or step < 1:
+        raise ValueError('Negative slice values are not supported')
+    frames = iter_frame_buffers(lmp)
+    for i, (buff, begin, end) in enumerate(frames):
+        if timestep:
+            value = read_timestep(buff, begin)
+            if value is None:
+                break
+        else:
+            value = i
+        if stop is not None and value >= stop:
+            break
+        if value < start or (value - start) % step != 0:
+            continue
+        yield buff[begin:end].decode('utf-8').splitlines(keepends=True)
+    frames.close()
+
+
 def read_box_line(line, box, dim):
     """Read box info from a line."""
     raw = line.strip().split()
@@ -142,21 +484,258 @@ def read_atom_data(atom_format, line):
     return formatted, _format
 
 
-def frame_to_dict(frame):
-    """Convert a raw data frame to a dictionary."""
-    item = None
+def select_atoms(atoms, select):
+    """Find the atoms matching all the given selection criteria.
+
+    Parameters
+    ----------
+    atoms : dict of numpy.arrays
+        The atom data, it must contain the columns used in select.
+    select : dict
+        The criteria to apply, for each column, the criterion is
+        either a tuple ``(low, high)`` giving an inclusive range, a
+        callable which is given the column and returns a boolean mask,
+        or a collection of allowed values.
+
+    Returns
+    -------
+    out : numpy.array of booleans
+        True for the selected atoms.
+    """
+    mask = None
+    for key, criterion in select.items():
+        values = atoms[key]
+        if callable(criterion):
+            keep = np.asarray(criterion(values), dtype=bool)
+        elif isinstance(criterion, tuple):
+            low, high = criterion
+            keep = (values >= low) & (values <= high)
+        else:
+            keep = np.isin(values, list(criterion))
+        mask = keep if mask is None else mask & keep
+    return mask
+
+
+def read_atom_lines(keys, lines, columns=None, select=None):
+    """Convert lines with atom data to arrays, one line at a time."""
     atom_format = None
+    table = {key: [] for key in keys}
+    for lines_i in lines:
+        formatted, atom_format = read_atom_data(atom_format, lines_i)
+        for key, val in zip(table.keys(), formatted):
+            table[key].append(val)
+    atoms = {key: np.array(val) for key, val in table.items()}
+    if select:
+        mask = select_atoms(atoms, select)
+        atoms = {key: val[mask] for key, val in atoms.items()}
+    if columns is not None:
+        atoms = {key: atoms[key] for key in columns}
+    return atoms
+
+
+def guess_atom_dtype(keys, line):
+    """Guess the numpy data types for the columns of the atom data."""
+    return [
+        (key, _NUMPY_TYPES[guess_string_format(val)])
+        for key, val in zip(keys, line.split())
+    ]
+
+
+def columns_to_table(atoms):
+    """Store a dictionary of arrays as one structured array."""
+    atoms = {key: np.asarray(val) for key, val in atoms.items()}
+    length = len(next(iter(atoms.values()), []))
+    table = np.empty(
+        length, dtype=[(key, val.dtype) for key, val in atoms.items()]
+    )
+    for key, val in atoms.items():
+        table[key] = val
+    return table
+
+
+def table_to_columns(table):
+    """Split a structured array into a dictionary of arrays."""
+    return {
+        key: np.ascontiguousarray(table[key]) for key in table.dtype.names
+    }
+
+
+def integer_atom_dtype(lines, dtype, names):
+    """Check the columns guessed to be integers from the first line.
+
+    A column is only kept as integers if all its values are integers,
+    otherwise it is read as floats, as :py:func:`.read_atom_lines`
+    gives it (for instance, velocities written as "0" in the first
+    line). Only the columns in names are checked.
+    """
+    keys = [key for key, _ in dtype]
+    checked = list(dtype)
+    for key in names:
+        i = keys.index(key)
+        if dtype[i][1] is np.int64:
+            try:
+                np.loadtxt(lines, dtype=np.int64, usecols=[i],
+                           comments=None, ndmin=1)
+            except ValueError:
+                checked[i] = (key, np.float64)
+    return checked
+
+
+def load_atom_columns(lines, dtype, columns):
+    """Parse the given columns from lines with atom data.
+
+    Returns
+    -------
+    out : numpy.array
+        A structured array with one field for each column. String
+        columns are stored as fixed length unicode strings.
+    """
+    keys = [key for key, _ in dtype]
+    usecols = [keys.index(key) for key in columns]
+    dtype = [dtype[i] for i in usecols]
+    if not lines:
+        return np.zeros(0, dtype=[
+            (key, str if fmt is object else fmt) for key, fmt in dtype
+        ])
+    table = np.loadtxt(lines, dtype=dtype, usecols=usecols, comments=None,
+                       ndmin=1)
+    if any(fmt is object for _, fmt in dtype):
+        table = columns_to_table({
+            key: np.array(table[key].tolist()) if fmt is object
+            else table[key] for key, fmt in dtype
+        })
+    return table
+
+
+def select_atom_lines(lines, dtype, columns, select=None):
+    """Parse the given columns for the atoms matching select.
+
+    The columns used in select are parsed for all atoms first, and the
+    other columns are then only parsed for the selected lines.
+
+    Returns
+    -------
+    out : numpy.array
+        A structured array with one field for each column.
+    """
+    if not select:
+        return load_atom_columns(lines, dtype, columns)
+    selected = load_atom_columns(lines, dtype, list(select))
+    mask = select_atoms(selected, select)
+    lines = [lines[i] for i in np.flatnonzero(mask)]
+    rest = [key for key in columns if key not in select]
+    if len(rest) == len(columns):
+        return load_atom_columns(lines, dtype, columns)
+    table = load_atom_columns(lines, dtype, rest) if rest else None
+    return columns_to_table({
+        key: selected[key][mask] if key in select else table[key]
+        for key in columns
+    })
+
+
+def read_atom_table(keys, lines, columns=None, select=None):
+    """Convert lines with atom data to a structured array in one go.
+
+    The data types of the columns are guessed from the first line and
+    the needed columns are parsed by ``numpy.loadtxt``. If a column
+    guessed to be integers also holds other numbers, it is parsed as
+    floats instead. If the lines can not be parsed, we fall back to
+    :py:func:`.read_atom_lines`. The parameters are as for
+    :py:func:`.read_atom_block`.
+    """
+    if columns is None:
+        columns = keys
+    needed = list(dict.fromkeys(list(columns) + list(select or ())))
+    for key in needed:
+        if key not in keys:
+            raise KeyError(f'Column "{key}" not found in the atom data')
+    if not lines:
+        return np.zeros(0, dtype=[(key, np.float64) for key in columns])
+    dtype = guess_atom_dtype(keys, lines[0])
+    if len(dtype) != len(keys):
+        return columns_to_table(
+            read_atom_lines(keys, lines, columns=columns, select=select)
+        )
+    try:
+        return select_atom_lines(lines, dtype, columns, select=select)
+    except ValueError:
+        pass
+    try:
+        dtype = integer_atom_dtype(lines, dtype, needed)
+        return select_atom_lines(lines, dtype, columns, select=select)
+    except ValueError:
+        return columns_to_table(
+            read_atom_lines(keys, lines, columns=columns, select=select)
+        )
+
+
+def read_atom_block(keys, lines, columns=None, select=None):
+    """Convert lines with atom data to arrays in one go.
+
+    This parses the lines with :py:func:`.read_atom_table` and gives
+    a contiguous array for each column.
+
+    Parameters
+    ----------
+    keys : list of strings
+        The names of the columns in the lines.
+    lines : list of strings
+        The atom data.
+    columns : list of strings, optional
+        The columns to convert. The default is to convert all.
+    select : dict, optional
+        Criteria for selecting atoms, see :py:func:`.select_atoms`.
+        Only the columns in the criteria are converted for all atoms,
+        the other columns are only converted for the selected atoms.
+    """
+    return table_to_columns(
+        read_atom_table(keys, lines, columns=columns, select=select)
+    )
+
+
+def find_block_end(frame, start, number=None):
+    """Find the end of the block of data lines starting at start."""
+    if number is not None:
+        end = start + number
+        if end == len(frame) or (
+                end < len(frame) and frame[end].startswith('ITEM:')):
+            return end
+    for i in range(start, len(frame)):
+        if frame[i].startswith('ITEM:'):
+            return i
+    return len(frame)
+
+
+def read_frame_items(frame, columns=None, select=None):
+    """Read the items in a frame, with the atoms in a structured array.
+
+    This is used by :py:func:`.frame_to_dict` and
+    :py:func:`.read_frame`, which describe the parameters.
+    """
+    item = None
     data = {}
-    for lines in frame:
+    i = 0
+    while i < len(frame):
+        lines = frame[i]
+        i += 1
         if lines.startswith('ITEM:'):
             item = lines.strip().split('ITEM:')[1].lower().strip()
             item_split = item.split()
             if item_split[0] == 'box':
                 item = 'box'
-                data[item] = {'bounds': [str(i) for i in item_split[2:]]}
+                data[item] = {'bounds': [str(j) for j in item_split[2:]]}
             elif item_split[0] == 'atoms':
                 item = 'atoms'
-                data[item] = {i: [] for i in item_split[1:]}
+                end = find_block_end(frame, i, data.get('number of atoms'))
+                if select and end - i != data['number of atoms']:
+                    print('Inconsistent data length for atoms')
+                data[item] = read_atom_table(
+                    item_split[1:], frame[i:end], columns=columns,
+                    select=select,
+                )
+                if select:
+                    data['number of atoms'] = len(data[item])
+                i = end
             else:
                 data[item] = []
             continue
@@ -165,19 +744,369 @@ def frame_to_dict(frame):
                 data[item] = int(lines.strip())
             elif item in ('box',):
                 read_for_box(data['box'], lines)
-            elif item in ('atoms',):
-                formatted, atom_format = read_atom_data(atom_format, lines)
-                for key, val in zip(data['atoms'].keys(), formatted):
-                    data['atoms'][key].append(val)
             else:
                 data[item].append(lines.strip())
+    return data
+
+
+def frame_to_dict(frame, columns=None, select=None):
+    """Convert a raw data frame to a dictionary.
+
+    Parameters
+    ----------
+    frame : list of strings
+        The lines of the frame, as given by :py:func:`.read_lammpstrj`.
+    columns : list of strings, optional
+        The atom columns to convert, the default is all columns.
+    select : dict, optional
+        Criteria for selecting atoms, see :py:func:`.select_atoms`.
+        When given, the "number of atoms" is the number of selected
+        atoms.
+    """
+    data = read_frame_items(frame, columns=columns, select=select)
+    data['atoms'] = table_to_columns(data['atoms'])
     for key, val in data['atoms'].items():
-        data['atoms'][key] = np.array(val)
-        if len(data['atoms'][key]) != data['number of atoms']:
+        if len(val) != data['number of atoms']:
             print(f'Inconsistent data length for {key}')
     return data
 
 
+# Order of the box information in Frame.box and in the cache:
+BOX_KEYS = ('xlo', 'xhi', 'ylo', 'yhi', 'zlo', 'zhi', 'xy', 'xz', 'yz')
+
+
+class Frame(Mapping):
+    """A frame from a trajectory, stored compactly.
+
+    The atoms are stored in one structured array and the box in one
+    array, so a frame needs far less memory than the dictionary given
+    by :py:func:`.frame_to_dict`. The frame can still be used as that
+    dictionary: ``frame['timestep']``, ``frame['number of atoms']``,
+    ``frame['box']`` (a dictionary) and ``frame['atoms']`` (a
+    dictionary with a view of each column) are available.
+
+    ``frame['atoms']`` and ``frame['box']`` are created once and the
+    same dictionaries are given every time, so changes to them are
+    kept. Changing the values in a column changes the structured array
+    too, but columns which are replaced or added, and changes to the
+    box dictionary, are only stored in the dictionaries. Setting
+    ``atoms`` or ``box`` to a new array, or updating the frame, gives
+    new dictionaries.
+
+    Attributes
+    ----------
+    timestep : integer
+        The timestep.
+    natoms : integer
+        The number of atoms.
+    box : numpy.array
+        The box, ``xlo, xhi, ylo, yhi, zlo, zhi`` and, for triclinic
+        boxes, ``xy, xz, yz``.
+    bounds : tuple of strings
+        The boundary conditions, for instance ``('pp', 'pp', 'pp')``.
+    atoms : numpy.array
+        The atoms, with one field for each column.
+    extra : dict or None
+        Other items in the frame, as lists of strings.
+    """
+
+    __slots__ = (
+        'timestep', 'natoms', '_box', '_box_items', 'bounds', '_atoms',
+        '_columns', 'extra',
+    )
+
+    def __init__(self, timestep, natoms, box, bounds, atoms, extra=None):
+        """Store the frame."""
+        self.timestep = timestep
+        self.natoms = natoms
+        self.box = box
+        self.bounds = bounds
+        self.atoms = atoms
+        self.extra = extra
+
+    @property
+    def box(self):
+        """Return the box as an array."""
+        return self._box
+
+    @box.setter
+    def box(self, box):
+        """Store a new box, the box dictionary is created again."""
+        self._box = box
+        self._box_items = None
+
+    @property
+    def atoms(self):
+        """Return the atoms as a structured array."""
+        return self._atoms
+
+    @atoms.setter
+    def atoms(self, atoms):
+        """Store new atoms, the column dictionary is created again."""
+        self._atoms = atoms
+        self._columns = None
+
+    @classmethod
+    def from_items(cls, data):
+        """Create a frame from the items read by read_frame_items."""
+        frame = cls(None, None, None, (), None)
+        frame.update(data)
+        return frame
+
+    def update(self, data):
+        """Replace the contents with the items read by read_frame_items.
+
+        The box array is reused if the box has the same shape, and the
+        atoms are only replaced if they are in the items. Columns
+        assigned to ``frame['atoms']`` and changes to ``frame['box']``
+        are dropped.
+        """
+        data = dict(data)
+        self._columns = None
+        self._box_items = None
+        self.timestep = data.pop('timestep', None)
+        self.natoms = data.pop('number of atoms', None)
+        box = data.pop('box', None)
+        if box is None:
+            self.box, self.bounds = None, ()
+        else:
+            self.bounds = tuple(box['bounds'])
+            values = [box[i] for i in BOX_KEYS if i in box]
+            if self.box is not None and len(self.box) == len(values):
+                self.box[:] = values
+            else:
+                self.box = np.array(values)
+        if 'atoms' in data:
+            self.atoms = data.pop('atoms')
+        self.extra = data or None
+
+    def copy(self):
+        """Return a copy of the frame which does not share arrays.
+
+        Only the arrays are copied, not columns assigned to
+        ``frame['atoms']`` or changes to ``frame['box']``.
+        """
+        return Frame(
+            self.timestep,
+            self.natoms,
+            None if self.box is None else self.box.copy(),
+            self.bounds,
+            None if self.atoms is None else self.atoms.copy(),
+            extra=None if self.extra is None else dict(self.extra),
+        )
+
+    def box_dict(self):
+        """Return the box as a dictionary, like frame_to_dict gives it."""
+        box = {'bounds': list(self.bounds)}
+        box.update(zip(BOX_KEYS, self.box.tolist()))
+        return box
+
+    def _keys(self):
+        """Return the keys for the dictionary access."""
+        keys = ['timestep', 'number of atoms', 'box', 'atoms']
+        keys = [
+            key for key, val in zip(
+                keys, (self.timestep, self.natoms, self.box, self.atoms)
+            ) if val is not None
+        ]
+        return keys + list(self.extra or ())
+
+    def __getitem__(self, key):
+        """Give the items as frame_to_dict does."""
+        if key == 'timestep' and self.timestep is not None:
+            return self.timestep
+        if key == 'number of atoms' and self.natoms is not None:
+            return self.natoms
+        if key == 'box' and self.box is not None:
+            if self._box_items is None:
+                self._box_items = self.box_dict()
+            return self._box_items
+        if key == 'atoms' and self.atoms is not None:
+            if self._columns is None:
+                self._columns = {
+                    i: self.atoms[i] for i in self.atoms.dtype.names
+                }
+            return self._columns
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        """Iterate over the keys."""
+        return iter(self._keys())
+
+    def __len__(self):
+        """Return the number of keys."""
+        return len(self._keys())
+
+    def __repr__(self):
+        """Show the timestep and the columns."""
+        names = () if self.atoms is None else self.atoms.dtype.names
+        return (f'Frame(timestep={self.timestep}, natoms={self.natoms}, '
+                f'columns={names})')
+
+
+def read_frame(frame, columns=None, select=None):
+    """Convert a raw data frame to a :py:class:`.Frame`.
+
+    The parameters are as for :py:func:`.frame_to_dict`.
+    """
+    data = read_frame_items(frame, columns=columns, select=select)
+    if len(data['atoms']) != data['number of atoms']:
+        print('Inconsistent data length for atoms')
+    return Frame.from_items(data)
+
+
+def read_frame_header(buff, begin, end):
+    """Read the items before the atom data in a frame.
+
+    Parameters
+    ----------
+    buff : bytes or mmap.mmap
+        A buffer containing the frame.
+    begin, end : integers
+        The start and end of the frame in the buffer.
+
+    Returns
+    -------
+    data : dict
+        The items, as :py:func:`.read_frame_items` gives them, but with
+        the names of the atom columns as "atoms".
+    start : integer
+        The position in the buffer where the atom data starts.
+    """
+    pos = buff.find(b'ITEM: ATOMS', begin, end)
+    if pos == -1:
+        raise ValueError('No atoms found in the frame')
+    start = buff.find(b'\n', pos, end)
+    start = end if start == -1 else start + 1
+    lines = buff[begin:start].decode('utf-8').splitlines(keepends=True)
+    data = read_frame_items(lines[:-1])
+    data['atoms'] = lines[-1].split()[2:]
+    return data, start
+
+
+def reused_atom_dtype(keys, line, columns=None):
+    """Get the data type and the columns to read for reused frames."""
+    dtype = guess_atom_dtype(keys, line)
+    if len(dtype) != len(keys):
+        raise ValueError('The atom data does not match the columns')
+    if columns is None:
+        columns = keys
+    for key in columns:
+        if key not in keys:
+            raise KeyError(f'Column "{key}" not found in the atom data')
+    usecols = [keys.index(key) for key in columns]
+    return np.dtype([dtype[i] for i in usecols]), usecols
+
+
+def read_atom_rows(buff, start, end, out, usecols,
+                   chunk_size=REUSED_BYTES):
+    """Parse atom data into an existing structured array.
+
+    The atom lines in ``buff[start:end]`` are parsed in parts of about
+    chunk_size bytes, each by one call to numpy, so only the part and
+    a small temporary array are needed in addition to out.
+
+    Returns
+    -------
+    out : integer
+        The number of rows read, less than ``len(out)`` if the data
+        ends early.
+
+    Raises
+    ------
+    ValueError
+        If the data can not be parsed, or if a column stored as
+        integers has non-integer values.
+    """
+    rows = 0
+    pos = start
+    while pos < end and rows < len(out):
+        cut = buff.find(b'\n', min(pos + chunk_size, end - 1), end)
+        cut = end if cut == -1 else cut + 1
+        text = buff[pos:cut].decode('utf-8')
+        pos = cut
+        if not text.strip():
+            continue
+        part = np.loadtxt(io.StringIO(text), dtype=out.dtype,
+                          usecols=usecols, comments=None, ndmin=1)
+        part = part[:len(out) - rows]
+        out[rows:rows + len(part)] = part
+        rows += len(part)
+    return rows
+
+
+def iter_frames_reused(lmp, columns=None, copy=False):
+    """Iterate over the frames, reading the atoms into reused arrays.
+
+    The atoms are read into a structured array which is allocated for
+    the first frame and reused for the following frames. It is only
+    allocated again when the number of atoms or the columns change.
+    The atom lines are parsed in parts of about 1 MB, by one call to
+    numpy for each part, and the parsed columns are copied into the
+    structured array, so neither the lines nor the whole frame are
+    held in memory as text.
+
+    The same :py:class:`.Frame` is updated and given for every frame,
+    so it is only valid until the next frame is read. Use
+    ``copy=True`` (or ``frame.copy()``) to keep frames.
+
+    Parameters
+    ----------
+    lmp : string, pathlib.Path or object like MultiTrajectory
+        The trajectory to read.
+    columns : list of strings, optional
+        The atom columns to read, the default is all columns.
+    copy : boolean, optional
+        If True, a copy of each frame is given.
+
+    Yields
+    ------
+    out : object like Frame
+        The frames.
+    """
+    frame = None
+    keys = None
+    dtype = None
+    for buff, begin, end in iter_frame_buffers(lmp):
+        data, start = read_frame_header(buff, begin, end)
+        natoms = data['number of atoms']
+        new_keys = data.pop('atoms')
+        if new_keys != keys:
+            keys = new_keys
+            dtype = None
+        if frame is None:
+            frame = Frame.from_items(data)
+        else:
+            frame.update(data)
+        if natoms == 0:
+            frame.atoms = read_atom_table(keys, [], columns=columns)
+            yield frame.copy() if copy else frame
+            continue
+        if dtype is None:
+            line_end = buff.find(b'\n', start, end)
+            line = buff[start:end if line_end == -1 else line_end]
+            dtype, usecols = reused_atom_dtype(keys, line.decode('utf-8'),
+                                               columns=columns)
+        if (frame.atoms is None or frame.atoms.dtype != dtype or
+                len(frame.atoms) != natoms):
+            frame.atoms = np.empty(natoms, dtype=dtype)
+        try:
+            rows = read_atom_rows(buff, start, end, frame.atoms, usecols)
+        except ValueError:
+            # The guessed types do not hold, read as frame_to_dict:
+            lines = buff[start:end].decode('utf-8').splitlines()
+            frame.atoms = read_atom_table(keys, lines[:natoms],
+                                          columns=columns)
+            dtype = frame.atoms.dtype
+            rows = len(frame.atoms)
+        if rows != natoms:
+            print('Inconsistent data length for atoms')
+            frame.atoms = frame.atoms[:rows]
+        yield frame.copy() if copy else frame
+
+
 def main(infile):
     """Write a reduced lammpstrj file by skipping frames."""
     for i, frame in enumerate(read_lammpstrj(infile)):
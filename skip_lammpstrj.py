@@ -1,29 +1,33 @@
 #!/usr/bin/env python
 """Write a reduced lammpstrj file by skipping frames."""
+import argparse
+import itertools
 import pathlib
-import sys
+import os
 import re
 import io
 import mmap
 from tqdm import tqdm
-
-
-def read_lammpstrj(lmp):
-    """Iterate frames in a lammpstrj file."""
-    raw = []
-    with open(lmp, 'r') as infile:
-        for lines in infile:
-            if lines.startswith('ITEM: TIMESTEP'):
-                if raw:
-                    yield raw
-                raw = []
-            raw.append(lines)
-    if raw:
-        yield raw
+from binary_lammpstrj import BinaryTrajectory, is_binary_dump
+from multi_lammpstrj import (
+    MultiTrajectory,
+    find_segments,
+    open_trajectory_files,
+)
+from read_lammpstrj import (
+    compression_format,
+    iter_frame_buffers,
+    iter_frame_ranges,
+    read_lammpstrj_slice,
+)
 
 
 def count_frames(lmp):
     """Count the number of frames in a lammpstrj file."""
+    if isinstance(lmp, MultiTrajectory):
+        return len(lmp)
+    if compression_format(lmp) is not None:
+        return sum(1 for _ in iter_frame_buffers(lmp))
     pattern = re.compile(b'ITEM: TIMESTEP')
     with io.open(lmp, 'r', encoding='utf-8') as infile:
         match = pattern.finditer(
@@ -33,18 +37,214 @@ def count_frames(lmp):
     return 0
 
 
-def main(infile, skip=10):
+def write_range(view, infile, output, begin, end):
+    """Write the bytes begin:end of the input file to the output.
+
+    The bytes are copied within the kernel when possible
+    (``os.copy_file_range``), otherwise they are written from a
+    memoryview of the input file.
+    """
+    if hasattr(os, 'copy_file_range'):
+        output.flush()
+        try:
+            while begin < end:
+                copied = os.copy_file_range(
+                    infile.fileno(), output.fileno(), end - begin,
+                    offset_src=begin,
+                )
+                if copied == 0:
+                    break
+                begin += copied
+        except OSError:
+            pass
+    if begin < end:
+        output.write(view[begin:end])
+
+
+def skip_frames(infile, outfile, skip, progress=None):
+    """Write every skip'th frame to a new file, in a single pass.
+
+    The frames are located in a memory map of the input file and the
+    kept frames are copied as bytes, consecutive frames are copied
+    together. Compressed files are decompressed as a stream and the
+    new file is written uncompressed.
+
+    Parameters
+    ----------
+    infile : string, pathlib.Path or object like MultiTrajectory
+        The file to read frames from. Trajectories split over several
+        files and binary dumps (as :py:class:`.BinaryTrajectory`) are
+        also accepted.
+    outfile : string or pathlib.Path
+        The file to write frames to.
+    skip : integer
+        Every skip'th frame is written, starting with the first one.
+    progress : object like tqdm.tqdm, optional
+        If given, it is updated with the number of bytes processed
+        (after decompression).
+
+    Returns
+    -------
+    out : tuple of integers
+        The number of frames read and the number of frames written.
+    """
+    if isinstance(infile, MultiTrajectory):
+        return skip_segments(infile, outfile, skip, progress=progress)
+    if isinstance(infile, BinaryTrajectory):
+        return skip_binary(infile, outfile, skip, progress=progress)
+    frames_read = 0
+    frames = 0
+    if compression_format(infile) is not None:
+        with open(outfile, 'wb') as output:
+            for i, (buff, begin, end) in enumerate(iter_frame_buffers(infile)):
+                frames_read += 1
+                if i % skip == 0:
+                    frames += 1
+                    output.write(buff[begin:end])
+                if progress is not None:
+                    progress.update(end - begin)
+        return frames_read, frames
+    with open(infile, 'rb') as inp, open(outfile, 'wb') as output:
+        if os.fstat(inp.fileno()).st_size == 0:
+            return frames_read, frames
+        with mmap.mmap(inp.fileno(), 0, access=mmap.ACCESS_READ) as mem:
+            with memoryview(mem) as view:
+                keep = None
+                done = 0
+                for i, (begin, end) in enumerate(iter_frame_ranges(mem)):
+                    frames_read += 1
+                    if i % skip == 0:
+                        frames += 1
+                        if keep is not None and keep[1] == begin:
+                            keep[1] = end
+                        else:
+                            if keep is not None:
+                                write_range(view, inp, output, *keep)
+                            keep = [begin, end]
+                    if progress is not None:
+                        progress.update(end - done)
+                        done = end
+                if keep is not None:
+                    write_range(view, inp, output, *keep)
+    return frames_read, frames
+
+
+def used_bytes(traj):
+    """Count the bytes used from the files of a multi-file trajectory."""
+    return sum(
+        int(segment.index['offset'][length] - segment.index['offset'][0])
+        for segment, length in zip(traj.segments, traj.lengths)
+    )
+
+
+def skip_segments(traj, outfile, skip, progress=None):
+    """Write every skip'th frame of a trajectory split over files.
+
+    This works as :py:func:`.skip_frames`, but the frames are located
+    with the frame index of each file and the duplicated frames are
+    left out, see :py:class:`multi_lammpstrj.MultiTrajectory`.
+    """
+    frames = 0
+    first = 0  # the number of the first frame in the current file
+    with open(outfile, 'wb') as output:
+        for segment, length in zip(traj.segments, traj.lengths):
+            keep = range(-first % skip, length, skip)
+            frames += len(keep)
+            if compression_format(segment.filename) is not None:
+                buffers = itertools.islice(
+                    iter_frame_buffers(segment.filename), length
+                )
+                for i, (buff, begin, end) in enumerate(buffers):
+                    if (first + i) % skip == 0:
+                        output.write(buff[begin:end])
+                    if progress is not None:
+                        progress.update(end - begin)
+                first += length
+                continue
+            with open(segment.filename, 'rb') as inp:
+                with mmap.mmap(inp.fileno(), 0,
+                               access=mmap.ACCESS_READ) as mem:
+                    with memoryview(mem) as view:
+                        ranges = traj.byte_ranges(first + i for i in keep)
+                        for _, begin, end in ranges:
+                            write_range(view, inp, output, begin, end)
+            if progress is not None:
+                offset = segment.index['offset']
+                progress.update(int(offset[length] - offset[0]))
+            first += length
+    return len(traj), frames
+
+
+def skip_binary(traj, outfile, skip, progress=None):
+    """Write every skip'th frame of a binary dump to a new binary dump.
+
+    Each frame in a binary dump has its own header, so the frames are
+    located with the frame index and copied as bytes, consecutive
+    frames together, as in :py:func:`.skip_frames`.
+    """
+    offset = traj.index['offset']
+    keep = range(0, len(traj), skip)
+    ranges = [[int(offset[i]), int(offset[i + 1])] for i in keep]
+    if skip == 1 and ranges:
+        ranges = [[ranges[0][0], ranges[-1][1]]]
+    with open(traj.filename, 'rb') as inp, open(outfile, 'wb') as output:
+        if ranges:
+            with mmap.mmap(inp.fileno(), 0, access=mmap.ACCESS_READ) as mem:
+                with memoryview(mem) as view:
+                    for begin, end in ranges:
+                        write_range(view, inp, output, begin, end)
+    if progress is not None:
+        progress.update(int(offset[-1] - offset[0]))
+    return len(traj), len(keep)
+
+
+def main(infile, skip=10, single_pass=True):
     """Write a reduced lammpstrj file by skipping frames."""
     print('Skip: {}'.format(skip))
     print('Infile: {}'.format(infile))
-    infile_path = pathlib.Path(infile).resolve()
-    outfile = '{}-skip-{}.lammpstrj'.format(
-        str(pathlib.Path(infile).stem), skip
-    )
+    infile_path = open_trajectory_files(infile)
+    first_file = pathlib.Path(find_segments(infile)[0]).resolve()
+    if is_binary_dump(first_file):
+        if isinstance(infile_path, MultiTrajectory):
+            raise ValueError('Binary dumps split over files are not supported')
+        infile_path = BinaryTrajectory(first_file)
+        # Binary frames can only be copied as bytes:
+        single_pass = True
+    elif isinstance(infile_path, MultiTrajectory):
+        print('Files: {}'.format(len(infile_path.segments)))
+        print('Duplicated frames left out: {}'.format(
+            infile_path.duplicates))
+    else:
+        infile_path = first_file
+    stem = first_file.stem
+    suffix = '.lammpstrj'
+    if compression_format(first_file) is not None:
+        stem = pathlib.Path(stem).stem
+    if isinstance(infile_path, BinaryTrajectory):
+        suffix = first_file.suffix
+    outfile = '{}-skip-{}{}'.format(stem, skip, suffix)
 
-    outfile_path = infile_path.parent.joinpath(outfile)
+    outfile_path = first_file.parent.joinpath(outfile)
     print('Outfile: {}'.format(outfile_path))
 
+    if single_pass:
+        size = None
+        if isinstance(infile_path, MultiTrajectory):
+            size = used_bytes(infile_path)
+        elif isinstance(infile_path, BinaryTrajectory):
+            size = int(infile_path.index['offset'][-1])
+        elif compression_format(infile_path) is None:
+            size = infile_path.stat().st_size
+        with tqdm(total=size, unit='B', unit_scale=True) as pbar:
+            frames_read, frames = skip_frames(
+                infile_path, outfile_path, skip, progress=pbar
+            )
+        if frames_read < 1:
+            print('No frames found.')
+        print('Frames read: {}'.format(frames_read))
+        print('Frames written to new file: {}'.format(frames))
+        return
+
     print('Getting number of frames in original file...')
     frames_tot = count_frames(infile_path)
     print('Frames in original file: {}'.format(frames_tot))
@@ -53,22 +253,44 @@ def main(infile, skip=10):
         return
 
     frames = 0
-    frames_read = 0
-    with tqdm(total=frames_tot) as pbar:
+    with tqdm(total=(frames_tot + skip - 1) // skip) as pbar:
         with open(outfile_path, 'w') as output:
-            for i, frame in enumerate(read_lammpstrj(infile_path)):
-                frames_read += 1
+            for frame in read_lammpstrj_slice(infile_path, step=skip):
                 pbar.update(1)
-                if i % skip == 0:
-                    frames += 1
-                    output.write(''.join(frame))
-        print('Frames read: {}'.format(frames_read))
+                frames += 1
+                output.write(''.join(frame))
+        print('Frames read: {}'.format(frames_tot))
         print('Frames written to new file: {}'.format(frames))
     return
 
 
+def create_parser():
+    """Create a parser."""
+    parser = argparse.ArgumentParser(
+        description='Write a reduced lammpstrj file by skipping frames'
+    )
+    parser.add_argument(
+        'infile',
+        help=('File to read frames from, or a pattern like '
+              '"dump.*.lammpstrj" for a trajectory split over files'),
+    )
+    parser.add_argument(
+        'skip',
+        help='Write every N\'th frame',
+        nargs='?',
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        '-t',
+        '--two-pass',
+        help='Count frames first and copy frames as text',
+        required=False,
+        action='store_true'
+    )
+    return parser
+
+
 if __name__ == '__main__':
-    try:
-        main(sys.argv[1], skip=int(sys.argv[2]))
-    except IndexError:
-        main(sys.argv[1])
+    ARGS = create_parser().parse_args()
+    main(ARGS.infile, skip=ARGS.skip, single_pass=not ARGS.two_pass)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""Calculate statistics for the thermo output in LAMMPS log files.
+
+The statistics are updated as the thermo output is read, in chunks,
+so the data is never kept in memory. For each column we keep the
+running mean and variance and the running mean and variance of block
+averages for blocks of 2, 4, 8, ... rows (the blocking method of
+Flyvbjerg and Petersen). The block averages give the standard error
+of the mean for correlated data and, from this, an estimate of the
+integrated autocorrelation time. The state only grows with the
+logarithm of the number of rows.
+"""
+import argparse
+import numpy as np
+from read_lammps_log import CHUNK_SIZE, read_lammps_log_chunks
+
+
+# The least number of blocks for a blocking level to be used for the
+# standard error:
+MIN_BLOCKS = 32
+
+
+class Moments:
+    """Running count, mean and sum of squared deviations.
+
+    Chunks of rows are added with the pairwise update of Chan et al.,
+    which is numerically stable also for large offsets (for instance,
+    timesteps or total energies).
+    """
+
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, ncol):
+        """Start with no rows."""
+        self.count = 0
+        self.mean = np.zeros(ncol)
+        self.m2 = np.zeros(ncol)
+
+    def update(self, values):
+        """Add the rows in a 2D array."""
+        count = len(values)
+        if count == 0:
+            return
+        mean = values.mean(axis=0)
+        m2 = ((values - mean)**2).sum(axis=0)
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta**2 * self.count * count / total
+        self.count = total
+
+    def variance(self):
+        """Return the sample variance (NaN for less than two rows)."""
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return self.m2 / (self.count - 1)
+
+
+class RunningStats:
+    """Running statistics for the columns of a data series.
+
+    Rows are added with :py:meth:`.update`, either one at a time or in
+    chunks, and the results are the same in both cases.
+
+    Attributes
+    ----------
+    levels : list of objects like Moments
+        The statistics of the block averages, where level ``k`` has
+        blocks of ``2**k`` rows. Level 0 is the data itself.
+    """
+
+    __slots__ = ('levels', '_pending')
+
+    def __init__(self):
+        """Start with no rows."""
+        self.levels = []
+        self._pending = []
+
+    @property
+    def count(self):
+        """Return the number of rows."""
+        return self.levels[0].count if self.levels else 0
+
+    def update(self, values):
+        """Add rows, given as a 2D array or as a single row."""
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        level = 0
+        while len(values) > 0:
+            if level == len(self.levels):
+                self.levels.append(Moments(values.shape[1]))
+                self._pending.append(None)
+            self.levels[level].update(values)
+            if self._pending[level] is not None:
+                values = np.vstack([self._pending[level], values])
+            self._pending[level] = None
+            if len(values) % 2 == 1:
+                self._pending[level] = values[-1:].copy()
+                values = values[:-1]
+            values = 0.5 * (values[0::2] + values[1::2])
+            level += 1
+
+    def mean(self):
+        """Return the mean of each column."""
+        return self.levels[0].mean
+
+    def variance(self):
+        """Return the sample variance of each column."""
+        return self.levels[0].variance()
+
+    def block_errors(self):
+        """Return the standard error estimated at each blocking level.
+
+        Returns
+        -------
+        out : tuple of numpy.arrays
+            The number of blocks at each level and the standard error
+            of the mean for each level and column.
+        """
+        blocks = np.array([i.count for i in self.levels])
+        errors = np.array([
+            np.sqrt(i.variance() / i.count) for i in self.levels
+        ])
+        return blocks, errors
+
+    def standard_error(self, min_blocks=MIN_BLOCKS):
+        """Estimate the standard error of the mean of each column.
+
+        This is the largest error over the blocking levels with at
+        least ``min_blocks`` blocks, where the error should have
+        reached a plateau when the blocks are longer than the
+        correlation time. With fewer rows, the error for uncorrelated
+        data is given.
+        """
+        blocks, errors = self.block_errors()
+        use = blocks >= min_blocks
+        if not use.any():
+            return errors[0]
+        return np.nanmax(errors[use], axis=0)
+
+    def autocorrelation_time(self, min_blocks=MIN_BLOCKS):
+        """Estimate the integrated autocorrelation time of each column.
+
+        The time is given in rows, as ``1/2 + sum(rho)`` (0.5 for
+        uncorrelated data), from the ratio of the squared standard
+        error from blocking to the one for uncorrelated data.
+        """
+        error = self.standard_error(min_blocks=min_blocks)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 0.5 * self.count * error**2 / self.variance()
+
+    def summary(self, keys, min_blocks=MIN_BLOCKS):
+        """Return the statistics for each column as a dictionary."""
+        stats = {
+            'count': np.full(len(keys), self.count),
+            'mean': self.mean(),
+            'std': np.sqrt(self.variance()),
+            'sem': self.standard_error(min_blocks=min_blocks),
+            'tau': self.autocorrelation_time(min_blocks=min_blocks),
+        }
+        return {
+            key: {name: float(val[i]) for name, val in stats.items()}
+            for i, key in enumerate(keys)
+        }
+
+
+def log_statistics(logfile, chunk_size=CHUNK_SIZE, min_blocks=MIN_BLOCKS):
+    """Calculate statistics for the thermo output of each run in a log.
+
+    Returns
+    -------
+    out : list of tuples
+        The number of the run, the keys and the statistics for each
+        key (see :py:meth:`.RunningStats.summary`).
+    """
+    runs = {}
+    for run, keys, data in read_lammps_log_chunks(logfile,
+                                                  chunk_size=chunk_size):
+        if run not in runs:
+            runs[run] = (keys, RunningStats())
+        runs[run][1].update(data)
+    return [
+        (run, keys, stats.summary(keys, min_blocks=min_blocks))
+        for run, (keys, stats) in runs.items()
+    ]
+
+
+def print_statistics(logfile, results):
+    """Print the statistics for the runs in a log file."""
+    print(f'{logfile}:')
+    for run, _, summary in results:
+        print(f'Run {run}:')
+        print(f'{"key":>20s} {"rows":>10s} {"mean":>14s} {"std":>12s} '
+              f'{"sem":>12s} {"tau":>10s}')
+        for key, stats in summary.items():
+            print(f'{key:>20s} {stats["count"]:10.0f} {stats["mean"]:14.6g} '
+                  f'{stats["std"]:12.4g} {stats["sem"]:12.4g} '
+                  f'{stats["tau"]:10.4g}')
+
+
+def create_parser():
+    """Create a parser."""
+    parser = argparse.ArgumentParser(
+        description='Calculate statistics for thermo output in LAMMPS logs'
+    )
+    parser.add_argument('logfiles', help='Log files to read', nargs='+')
+    parser.add_argument(
+        '-b',
+        '--min-blocks',
+        help='Least number of blocks used for the standard error',
+        type=int,
+        default=MIN_BLOCKS,
+    )
+    return parser
+
+
+if __name__ == '__main__':
+    ARGS = create_parser().parse_args()
+    for LOGFILE in ARGS.logfiles:
+        print_statistics(
+            LOGFILE, log_statistics(LOGFILE, min_blocks=ARGS.min_blocks)
+        )
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+"""Write a reduced lammpstrj file with a subset of the frames and atoms.
+
+In one pass over the trajectory, every N'th frame is kept, atoms are
+selected by type, id and/or a region, and only some of the atom
+columns are written. Frames are read, selected and written one at a
+time, so the memory needed does not depend on the size of the
+trajectory. The number of atoms in each written frame is the number
+of selected atoms.
+"""
+import argparse
+import itertools
+import pathlib
+import numpy as np
+from tqdm import tqdm
+from binary_lammpstrj import (
+    BinaryTrajectory,
+    is_binary_dump,
+    read_binary_dump,
+)
+from multi_lammpstrj import find_segments, open_trajectory_files
+from read_lammpstrj import (
+    compression_format,
+    format_lammpstrj_frame,
+    read_frame,
+    read_lammpstrj_slice,
+)
+
+
+def parse_values(text):
+    """Read a selection like "1,2,10-20" for an integer column.
+
+    Returns
+    -------
+    out : set, tuple or callable
+        A set for single values, a tuple for a single range, and
+        otherwise a function giving a boolean mask, as used by
+        :py:func:`read_lammpstrj.select_atoms`.
+    """
+    values, ranges = set(), []
+    for i in text.split(','):
+        if '-' in i:
+            low, high = i.split('-')
+            ranges.append((int(low), int(high)))
+        else:
+            values.add(int(i))
+    if not ranges:
+        return values
+    if not values and len(ranges) == 1:
+        return ranges[0]
+
+    def criterion(column):
+        mask = np.isin(column, list(values))
+        for low, high in ranges:
+            mask |= (column >= low) & (column <= high)
+        return mask
+
+    return criterion
+
+
+def parse_region(text):
+    """Read a region like "x:0:10,z:5.5:20" as inclusive ranges."""
+    region = {}
+    for i in text.split(','):
+        key, low, high = i.split(':')
+        region[key] = (float(low), float(high))
+    return region
+
+
+def build_selection(types=None, ids=None, region=None):
+    """Combine the selections into criteria for select_atoms.
+
+    Parameters
+    ----------
+    types, ids : set, tuple or callable, optional
+        The atom types and ids to select, see
+        :py:func:`read_lammpstrj.select_atoms`.
+    region : dict of tuples, optional
+        Inclusive ranges for columns, for instance, ``{'z': (0, 10)}``
+        selects atoms with ``0 <= z <= 10``.
+
+    Returns
+    -------
+    out : dict or None
+        The criteria, or None if nothing is selected.
+    """
+    select = {}
+    if types is not None:
+        select['type'] = types
+    if ids is not None:
+        select['id'] = ids
+    if region is not None:
+        select.update(region)
+    return select or None
+
+
+def subset_frames(lmp, columns=None, select=None, start=None, stop=None,
+                  step=None):
+    """Iterate over a subset of the frames and atoms in a trajectory.
+
+    Parameters
+    ----------
+    lmp : string, pathlib.Path or object like MultiTrajectory
+        The trajectory to read. Binary dumps are also accepted.
+    columns : list of strings, optional
+        The atom columns to keep, the default is all columns.
+    select : dict, optional
+        Criteria for selecting atoms, see
+        :py:func:`read_lammpstrj.select_atoms`.
+    start, stop, step : integers, optional
+        The frames to read, as for ``frames[start:stop:step]``.
+
+    Yields
+    ------
+    out : object like read_lammpstrj.Frame
+        The frames, with the selected atoms and columns.
+    """
+    if not hasattr(lmp, 'iter_frame_buffers') and is_binary_dump(lmp):
+        yield from subset_binary_frames(lmp, columns=columns, select=select,
+                                        start=start, stop=stop, step=step)
+        return
+    for frame in read_lammpstrj_slice(lmp, start=start, stop=stop,
+                                      step=step):
+        yield read_frame(frame, columns=columns, select=select)
+
+
+def subset_binary_frames(lmp, columns=None, select=None, start=None,
+                         stop=None, step=None):
+    """Iterate over a subset of the frames and atoms in a binary dump.
+
+    The frame index is used to go directly to the selected frames, so
+    the other frames are not read. Compressed binary dumps can not be
+    indexed and are read from the start. The parameters are as for
+    :py:func:`.subset_frames`.
+    """
+    if compression_format(lmp) is not None:
+        frames = read_binary_dump(lmp, columns=columns, select=select)
+        yield from itertools.islice(frames, start, stop, step)
+        return
+    with BinaryTrajectory(lmp, columns=columns, select=select) as traj:
+        for i in range(len(traj))[start:stop:step]:
+            yield traj[i]
+
+
+def write_subset(lmp, outfile, columns=None, select=None, start=None,
+                 stop=None, step=None, progress=None):
+    """Write a subset of the frames and atoms to a lammpstrj file.
+
+    The parameters are as for :py:func:`.subset_frames`, and
+    ``progress`` (an object like tqdm.tqdm) is updated for each frame
+    written.
+
+    Returns
+    -------
+    out : integer
+        The number of frames written.
+    """
+    frames = 0
+    with open(outfile, 'w') as output:
+        for frame in subset_frames(lmp, columns=columns, select=select,
+                                   start=start, stop=stop, step=step):
+            output.write(format_lammpstrj_frame(frame))
+            frames += 1
+            if progress is not None:
+                progress.update(1)
+    return frames
+
+
+def create_parser():
+    """Create a parser."""
+    parser = argparse.ArgumentParser(
+        description='Write a subset of the frames and atoms in a trajectory'
+    )
+    parser.add_argument(
+        'infile',
+        help=('File to read frames from, or a pattern like '
+              '"dump.*.lammpstrj" for a trajectory split over files'),
+    )
+    parser.add_argument(
+        '-s',
+        '--skip',
+        help='Write every N\'th frame',
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        '-t',
+        '--types',
+        help='Atom types to select, for instance "1,2" or "1-3"',
+        required=False,
+    )
+    parser.add_argument(
+        '-i',
+        '--ids',
+        help='Atom ids to select, for instance "1-1000,2001"',
+        required=False,
+    )
+    parser.add_argument(
+        '-r',
+        '--region',
+        help='Region to select, for instance "z:0:10" or "x:0:5,y:0:5"',
+        required=False,
+    )
+    parser.add_argument(
+        '-c',
+        '--columns',
+        help='Atom columns to write, for instance "id,type,x,y,z"',
+        required=False,
+    )
+    parser.add_argument(
+        '-o',
+        '--outfile',
+        help='File to write, the default is "infile-subset.lammpstrj"',
+        required=False,
+    )
+    return parser
+
+
+def main(args):
+    """Write a subset of a trajectory."""
+    infile = open_trajectory_files(args.infile)
+    first_file = pathlib.Path(find_segments(args.infile)[0])
+    outfile = args.outfile
+    if outfile is None:
+        stem = first_file.stem
+        if compression_format(first_file) is not None:
+            stem = pathlib.Path(stem).stem
+        outfile = first_file.with_name(f'{stem}-subset.lammpstrj')
+    select = build_selection(
+        types=None if args.types is None else parse_values(args.types),
+        ids=None if args.ids is None else parse_values(args.ids),
+        region=None if args.region is None else parse_region(args.region),
+    )
+    columns = None if args.columns is None else args.columns.split(',')
+    print('Infile: {}'.format(args.infile))
+    print('Outfile: {}'.format(outfile))
+    with tqdm(unit='frames') as pbar:
+        frames = write_subset(infile, outfile, columns=columns,
+                              select=select, step=args.skip, progress=pbar)
+    print('Frames written to new file: {}'.format(frames))
+
+
+if __name__ == '__main__':
+    main(create_parser().parse_args())
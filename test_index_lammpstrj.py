@@ -0,0 +1,42 @@
+"""Tests for the frame index of lammpstrj files."""
+from index_lammpstrj import IndexedTrajectory, build_frame_index
+
+
+def lammpstrj_frame(timestep, natoms):
+    """Create the text for a small frame."""
+    lines = [
+        'ITEM: TIMESTEP', str(timestep),
+        'ITEM: NUMBER OF ATOMS', str(natoms),
+        'ITEM: BOX BOUNDS pp pp pp',
+        '0.0 10.0', '0.0 10.0', '0.0 10.0',
+        'ITEM: ATOMS id type x y z',
+    ]
+    lines += [f'{i + 1} 1 {i}.0 0.5 1.5' for i in range(natoms)]
+    return '\n'.join(lines) + '\n'
+
+
+def test_truncated_last_frame_is_not_indexed(tmp_path):
+    """A last frame with missing atom lines is left out of the index."""
+    lmp = tmp_path / 'dump.lammpstrj'
+    complete = lammpstrj_frame(0, 4) + lammpstrj_frame(100, 4)
+    truncated = lammpstrj_frame(200, 4)
+    # Cut the last frame in the middle of its third atom line:
+    truncated = truncated[:truncated.index('3 1 2.0') + 4]
+    lmp.write_text(complete + truncated)
+    index = build_frame_index(lmp)
+    assert list(index['timestep']) == [0, 100]
+    assert index['offset'][-1] == len(complete)
+    with IndexedTrajectory(lmp) as traj:
+        assert len(traj) == 2
+        assert traj[-1]['number of atoms'] == 4
+        assert len(traj[-1]['atoms']['id']) == 4
+
+
+def test_truncated_frame_is_indexed_when_complete(tmp_path):
+    """The frame is indexed once the rest of it has been written."""
+    lmp = tmp_path / 'dump.lammpstrj'
+    frames = lammpstrj_frame(0, 4) + lammpstrj_frame(100, 4)
+    lmp.write_text(frames[:-1])
+    assert list(build_frame_index(lmp)['timestep']) == [0]
+    lmp.write_text(frames)
+    assert list(build_frame_index(lmp)['timestep']) == [0, 100]
@@ -0,0 +1,19 @@
+"""Tests for trajectories split over restart files."""
+from multi_lammpstrj import MultiTrajectory
+from test_index_lammpstrj import lammpstrj_frame
+
+
+def test_truncated_frame_before_restart(tmp_path):
+    """A half-written frame is replaced by the copy in the next file."""
+    first = tmp_path / 'dump.1.lammpstrj'
+    first.write_text(''.join(lammpstrj_frame(i, 3) for i in (0, 500)))
+    second = tmp_path / 'dump.2.lammpstrj'
+    text = ''.join(lammpstrj_frame(i, 3) for i in (500, 1000, 1500))
+    second.write_text(text[:-20])
+    third = tmp_path / 'dump.3.lammpstrj'
+    third.write_text(''.join(lammpstrj_frame(i, 3) for i in (1000, 1500)))
+    with MultiTrajectory([first, second, third]) as traj:
+        assert list(traj.timesteps) == [0, 500, 1000, 1500]
+        assert traj.duplicates == 2
+        assert traj.locate(3) == (2, 1)
+        assert len(traj.at_timestep(1500)['atoms']['id']) == 3